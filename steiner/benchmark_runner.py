@@ -34,12 +34,38 @@ parser.add_argument('-c', type=int, default=0, help="The limit in seconds for re
 
 parser.add_argument('--stats', type=int)
 
+parser.add_argument('--time', type=float, default=0,
+                    help="The limit in seconds, afterwards the best known solution is used")
+
+parser.add_argument('--memory', type=int, default=0,
+                    help="The limit in MB for the solver labels, afterwards the least promising labels are dropped")
+
+parser.add_argument('--cache', type=str, help="Directory for binary copies of parsed instances")
+
+parser.add_argument('--half', action='store_true',
+                    help="Let the solver only move sets with up to half of the terminals along edges")
+
+parser.add_argument('--dominance', action='store_true',
+                    help="Let the solver skip labels that are dominated by a label for a superset at the same node")
+
+parser.add_argument('--no-reduced-costs', dest='reduced_costs', action='store_false',
+                    help="Do not let the solver skip edges that are too expensive according to the reduced costs")
+
+parser.add_argument('--workers', type=int, default=0,
+                    help="The number of processes that calculate dual ascent bounds for the solver in advance")
+
 args = parser.parse_args()
 f = open(args.filename, "r")
-steiner = pp.parse_pace_file(f)
+if args.cache is not None:
+    steiner = pp.parse_pace_file_cached(f, args.cache)
+else:
+    steiner = pp.parse_pace_file(f)
 
 conf = sp.SolvingConfig(debug=True, split=args.s, pace_only=args.p, print_output=True, heavy_edges=args.e,
                         heap_width=args.d, bucket_limit=args.b, use_da=args.a, use_store=args.t, use_root=args.r, apply_reductions=True,
-                        node_limit=args.l, node_ratio_limit=args.q, reduction_limit=args.c)
+                        node_limit=args.l, node_ratio_limit=args.q, reduction_limit=args.c,
+                        time_limit=args.time, memory_limit=args.memory, half_sets=args.half,
+                        use_dominance=args.dominance, use_reduced_costs=args.reduced_costs,
+                        workers=args.workers)
 
 sp.run(steiner, conf)
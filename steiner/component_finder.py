@@ -2,6 +2,7 @@ import networkx as nx
 from sys import maxint
 import itertools as it
 from structures import union_find as uf, steiner_graph as sg
+from structures.array_graph import ArrayGraph
 
 """Tries to split the graph into two parts that can be solved separately. Originally this has only be done for 
 articulation points. The generalization of separators of larger size is from Polak and Maziarz' submission"""
@@ -19,7 +20,7 @@ def _find_articulation_points(steiner, blocked):
     points = []
     stack = []  # Call stack for DFS
 
-    for n in nx.nodes(steiner.graph):
+    for n in steiner.graph.nodes:
         if n not in visited and n not in blocked:
             stack.append(([n], None))
 
@@ -47,7 +48,7 @@ def _find_articulation_points(steiner, blocked):
                         low[u] = len(visited)
                         discovered[u] = low[u]
                         visited.add(u)
-                        stack.append((set(nx.neighbors(steiner.graph, u)).difference(blocked), u))
+                        stack.append((set(steiner.graph.neighbors(u)).difference(blocked), u))
 
     return points
 
@@ -118,7 +119,7 @@ def _find_articulation_sets(steiner, s, blocked=set()):
     else:
         # Try all vertices as part of the set, find APs given that the current vertex is not in the graph
         if len(blocked) == 0:
-            for n in nx.nodes(steiner.graph):
+            for n in steiner.graph.nodes:
                 result = _find_articulation_sets(steiner, s - 1, {n})
                 if result[0] > c_min[0]:
                     c_min = result
@@ -198,19 +199,28 @@ def _compute_partial_solutions(steiner, min_ap, rec):
 
                         return -1
 
-                    # Add edges to current subgraph. Keep track of mapped edges to restore them in the solution
+                    # Build the subgraph from the edges of the part, cut vertices that are not connected to the
+                    # part are left out. Keep track of mapped edges to restore them in the solution
+                    us = []
+                    vs = []
+                    ws = []
                     mapped = []
-                    for (u, v, d) in steiner.graph.edges(data='weight'):
+                    for u in c_part.union(aps):
                         up = map_node(u)
-                        vp = map_node(v)
-
-                        if up != vp and up != -1 and vp != -1:
-                            g.add_edge(up, vp, d)
-                            if up != u or vp != v:
-                                mapped.append(((up, vp, d), (u, v, d)))
+                        for (v, d) in steiner.graph.adj(u):
+                            vp = map_node(v)
+                            # Edges within the part are seen from both end points
+                            if u < v and up != vp and vp != -1:
+                                us.append(up)
+                                vs.append(vp)
+                                ws.append(d)
+                                if up != u or vp != v:
+                                    mapped.append(((up, vp, d), (u, v, d)))
+
+                    g.graph = ArrayGraph.from_edges(us, vs, ws)
 
                     # May happen if a vertex split the graph in more than one component
-                    if not nx.is_connected(g.graph):
+                    if not g.graph.is_connected():
                         break
 
                     # Add terminals
@@ -43,7 +43,7 @@ def solver(steiner, solver_config, node_limit, node_ratio):
     """Creates a solver"""
 
     if solver_config.use_da and len(steiner.graph.nodes) < node_limit and len(steiner.graph.edges) / len(steiner.graph.nodes) < node_ratio:
-        heuristic = da_heuristic.DaHeuristic(steiner)
+        heuristic = da_heuristic.DaHeuristic(steiner, workers=solver_config.workers)
         slv = sv.Solver2k(steiner, steiner.terminals, heuristic, solver_config)
     else:
         heuristic = mst_heuristic.MstHeuristic(steiner)
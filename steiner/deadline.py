@@ -0,0 +1,29 @@
+import signal
+from time import time
+
+"""Keeps track of the time budget of a run. The long running parts poll expired() and fall back to the best known
+solution once the budget is used up or the process has been asked to stop"""
+
+_end = None
+_interrupted = False
+
+
+def set_limit(seconds):
+    """Sets the budget in seconds from now on. Zero means no limit"""
+    global _end
+    _end = time() + seconds if seconds > 0 else None
+
+
+def interrupt(signum=None, frame=None):
+    """Marks the run as expired. Can be used as a signal handler"""
+    global _interrupted
+    _interrupted = True
+
+
+def handle_sigterm():
+    """Turns SIGTERM into an expired deadline instead of terminating the process"""
+    signal.signal(signal.SIGTERM, interrupt)
+
+
+def expired():
+    return _interrupted or (_end is not None and time() > _end)
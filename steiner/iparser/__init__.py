@@ -1,3 +1,4 @@
 from pace import parse_file as parse_pace_file
+from binary import parse_file_cached as parse_pace_file_cached
 
 """Contains all the parsers for input files"""
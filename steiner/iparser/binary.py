@@ -0,0 +1,100 @@
+import os
+import mmap
+import struct
+import hashlib
+from array import array
+from structures import steiner_graph as st
+from structures.array_graph import ArrayGraph
+import pace
+
+"""Caches parsed instances in a binary file. The file contains the compacted arrays of the graph, loading it is one
+copy per array from a memory mapped file instead of parsing the text. The cache is keyed by the hash of the input"""
+
+_magic = "STB1"
+# Magic, size of the long and int entries, number of node slots, number of edge entries, number of nodes,
+# number of terminals and number of edges
+_header = struct.Struct("=4s2b5q")
+
+
+def parse_file_cached(f, cache_dir):
+    """Parses the PACE file f. The result is taken from and stored in cache_dir"""
+    data = f.read()
+    f.close()
+
+    path = os.path.join(cache_dir, hashlib.sha1(data).hexdigest() + ".stb")
+    steiner = load(path)
+
+    if steiner is None:
+        steiner = pace.parse_data(data)
+        try:
+            save(steiner, path)
+        except (IOError, OSError):
+            # The cache is only an optimization
+            pass
+
+    return steiner
+
+
+def save(steiner, path):
+    g = steiner.graph.fork()
+    g.compact()
+    nodes = array('l', g.nodes)
+    terminals = array('l', steiner.terminals)
+
+    # Write to a temporary file first, other processes may read the same entry
+    tmp = "{}.{}.tmp".format(path, os.getpid())
+    with open(tmp, "wb") as f:
+        f.write(_header.pack(_magic, array('l').itemsize, array('i').itemsize, len(g._start), len(g._tgt),
+                             len(nodes), len(terminals), len(g.edges)))
+        for a in (g._start, g._deg, g._tgt, g._wt, nodes, terminals):
+            a.tofile(f)
+    os.rename(tmp, path)
+
+
+def load(path):
+    """Returns the cached instance or None if there is no usable entry"""
+    try:
+        f = open(path, "rb")
+    except IOError:
+        return None
+
+    with f:
+        size = os.fstat(f.fileno()).st_size
+        if size < _header.size:
+            return None
+
+        mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            magic, long_size, int_size, width, entries, node_count, terminal_count, edge_count = \
+                _header.unpack_from(mm)
+            if magic != _magic or long_size != array('l').itemsize or int_size != array('i').itemsize \
+                    or size != _header.size + (2 * width + node_count + terminal_count) * long_size \
+                    + entries * (long_size + int_size):
+                return None
+
+            pos = [_header.size]
+
+            def read(typecode, count):
+                a = array(typecode)
+                n = count * a.itemsize
+                a.fromstring(buffer(mm, pos[0], n))
+                pos[0] += n
+                return a
+
+            g = ArrayGraph()
+            g._start = read('l', width)
+            g._deg = read('l', width)
+            g._cap = array('l', g._deg)
+            g._tgt = read('i', entries)
+            g._wt = read('l', entries)
+            g._nodes = set(read('l', node_count))
+            g._edge_count = edge_count
+            terminals = read('l', terminal_count)
+        finally:
+            mm.close()
+
+    steiner = st.SteinerGraph()
+    steiner.graph = g
+    steiner.terminals = set(terminals)
+
+    return steiner
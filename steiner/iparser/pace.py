@@ -1,22 +1,84 @@
+import re
+from array import array
 from structures import steiner_graph as st
+from structures.array_graph import ArrayGraph
 
 """ Parses files with the PACE file format"""
 
+_section = re.compile(r'^[ \t]*section[ \t]+(graph|terminals)\b', re.I | re.M)
+_end = re.compile(r'^[ \t]*end\b', re.I | re.M)
+_edge_count = re.compile(r'^[ \t]*edges[ \t]+(\d+)', re.I | re.M)
+_terminal_count = re.compile(r'^[ \t]*terminals[ \t]+(\d+)', re.I | re.M)
+_edge = re.compile(r'^[ \t]*e[ \t]+(\d+)[ \t]+(\d+)[ \t]+(\d+)[ \t\r]*$', re.I | re.M)
+_terminal = re.compile(r'^[ \t]*t[ \t]+(\d+)[ \t\r]*$', re.I | re.M)
+
 
 def parse_graph(line, steiner):
     lst = line.split()
     if line.startswith("e "):
-        steiner.graph.add_edge(int(lst[1]), int(lst[2]), weight=int(lst[3]))
+        steiner.add_edge(int(lst[1]), int(lst[2]), int(lst[3]))
 
 
 def parse_terminal(line, steiner):
     lst = line.split()
     if line.startswith('t '):
-        steiner.graph.node[int(lst[1])]['terminal'] = True
         steiner.terminals.add(int(lst[1]))
 
 
 def parse_file(f):
+    """Reads the whole file at once and builds the graph in one go. Files with unusual sections are passed to the
+    line parser"""
+    data = f.read()
+    f.close()
+
+    return parse_data(data)
+
+
+def parse_data(data):
+    """Parses the contents of a file"""
+    sections = {}
+    for m in _section.finditer(data):
+        name = m.group(1).lower()
+        # As in the line parser, only the first section of each kind counts
+        if name not in sections:
+            end = _end.search(data, m.end())
+            sections[name] = data[m.end():end.start() if end is not None else len(data)]
+
+    steiner = _parse_bulk(sections)
+    if steiner is None:
+        steiner = parse_lines(data.splitlines())
+
+    return steiner
+
+
+def _parse_bulk(sections):
+    """Extracts all records with one regular expression per section. Returns None if the number of records does not
+    match the declared count"""
+    graph = sections.get("graph", "")
+    terminals = sections.get("terminals", "")
+
+    edges = _edge.findall(graph)
+    count = _edge_count.search(graph)
+    if count is None or int(count.group(1)) != len(edges):
+        return None
+
+    ts = _terminal.findall(terminals)
+    count = _terminal_count.search(terminals)
+    if count is None or int(count.group(1)) != len(ts):
+        return None
+
+    us = array('l', [int(e[0]) for e in edges])
+    vs = array('l', [int(e[1]) for e in edges])
+    ws = array('l', [int(e[2]) for e in edges])
+
+    steiner = st.SteinerGraph()
+    steiner.graph = ArrayGraph.from_edges(us, vs, ws)
+    steiner.terminals = set(int(t) for t in ts)
+
+    return steiner
+
+
+def parse_lines(lines):
     # 0 is start, 1 is graph, 2 are terminals, 3 are decompositions
     parse_mode = 0
     terminals_done = False
@@ -24,7 +86,7 @@ def parse_file(f):
 
     steiner = st.SteinerGraph()
 
-    for line in f:
+    for line in lines:
         line = line.strip().lower()
         if line.startswith("end"):
             parse_mode = 0
@@ -43,7 +105,4 @@ def parse_file(f):
 
     # Otherwise ignore
 
-    f.close()
-
     return steiner
-
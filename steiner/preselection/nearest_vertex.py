@@ -15,21 +15,20 @@ class NearestVertex:
 
         steiner.requires_dist(1)
         track = len(steiner.graph.edges)
-        nb = steiner.graph._adj
+        adj = steiner.graph.adj
 
         for t in list(steiner.terminals):
             # t may have been deleted before
-            if t in steiner.terminals and steiner.graph.degree[t] >= 2 and len(steiner.terminals) > 2:
+            if t in steiner.terminals and steiner.graph.degree(t) >= 2 and len(steiner.terminals) > 2:
                 e1 = (None, maxint, maxint)
                 e2 = (None, maxint)
                 e3 = (None, maxint)
 
                 # Find three smallest incident edges
-                for n, dta in nb[t].items():
-                    d = dta['weight']
+                for n, d in adj(t):
 
-                    cmp_val = d + steiner.get_closest(n)[1][1] if steiner.get_closest(n)[0][0] == t \
-                        else d + steiner.get_closest(n)[0][1]
+                    closest = steiner.get_closest(n)
+                    cmp_val = d + closest.get(1)[1] if closest[0][0] == t else d + closest[0][1]
 
                     if d < e1[1] or (d == e1[1] and cmp_val < e1[2]):
                         e3, e2, e1 = e2, e1, (n, d, cmp_val)
@@ -45,8 +44,8 @@ class NearestVertex:
                     contract = True
                 elif e2[1] < maxint and e3[1] >= e1[2] and e2[0] not in steiner.terminals:
                     contract = True
-                    for n2, dta in nb[e2[0]].items():
-                        if n2 != t and dta['weight'] < e1[2]:
+                    for n2, w in adj(e2[0]):
+                        if n2 != t and w < e1[2]:
                             contract = False
                             break
 
@@ -36,9 +36,7 @@ class NvSlPack:
             total += this_run
 
         if total > 0:
-            steiner._voronoi_areas = None
-            steiner._lengths = {}
-            steiner._closest_terminals = None
+            steiner._reset_lengths()
 
         return total
 
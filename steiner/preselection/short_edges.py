@@ -114,7 +114,7 @@ class ShortEdgeReduction:
 
                     if steiner.get_lengths(t1, t2) <= r_val:
                         # Store
-                        self.deleted.append((u, v, steiner.graph[u][v]['weight']))
+                        self.deleted.append((u, v, steiner.graph.weight(u, v)))
 
                         for e in steiner.contract_edge(u, v):
                             self.merged.append(e)
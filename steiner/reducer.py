@@ -1,4 +1,5 @@
 from time import time
+import deadline
 
 
 class DebugReduction:
@@ -44,6 +45,9 @@ class Reducer:
 
                 if self._reduction_limit > 0 and time() - start_time > self._reduction_limit:
                     return
+                # Out of time, stop at a point where unreduce works
+                if deadline.expired():
+                    return
 
             g.reset_all()
 
@@ -147,7 +147,7 @@ class BoundNtdkReduction:
 
         for n in list(steiner.graph.nodes):
             # TODO: Find a good upper bound for the degree
-            if n not in steiner.terminals and 2 < steiner.graph.degree[n] <= 5:
+            if n not in steiner.terminals and 2 < steiner.graph.degree(n) <= 5:
                 closest = steiner.get_restricted_closest(n)
 
                 if closest[2][1] < maxint:
@@ -158,8 +158,8 @@ class BoundNtdkReduction:
                         nb = list(steiner.graph.neighbors(n))
                         nb.sort()
                         for (n1, n2) in ((x, y) for x in nb for y in nb if y > x):
-                            c1 = steiner.graph[n][n1]['weight']
-                            c2 = steiner.graph[n][n2]['weight']
+                            c1 = steiner.graph.weight(n, n1)
+                            c2 = steiner.graph.weight(n, n2)
 
                             if steiner.add_edge(n1, n2, c1 + c2):
                                 self._removed[(n1, n2, c1 + c2)] = [(n, n1, c1), (n, n2, c2)]
@@ -223,7 +223,7 @@ class BoundGraphReduction:
             for n1 in t1_vor:
                 for n2 in t2_vor:
                     if steiner.graph.has_edge(n1, n2):
-                        min_cost = min(min_cost, steiner.graph[n1][n2]['weight'] + min(lg(t1, n1), lg(t2, n2)))
+                        min_cost = min(min_cost, steiner.graph.weight(n1, n2) + min(lg(t1, n1), lg(t2, n2)))
 
             if min_cost < maxint:
                 g_prime.add_edge(t1, t2, weight=min_cost)
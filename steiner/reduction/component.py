@@ -1,6 +1,3 @@
-from networkx import is_connected, connected_components
-
-
 class ComponentReduction:
     """ Checks if the graph has several components and removes unnecessary ones"""
 
@@ -9,8 +6,8 @@ class ComponentReduction:
 
     def reduce(self, steiner, prev_cnt, curr_cnt):
         track = len(steiner.graph.nodes)
-        if len(steiner.graph.nodes) > 1 and not is_connected(steiner.graph):
-            for c in list(connected_components(steiner.graph)):
+        if len(steiner.graph.nodes) > 1 and not steiner.graph.is_connected():
+            for c in list(steiner.graph.connected_components()):
                 found = False
                 for n in c:
                     if n in steiner.terminals:
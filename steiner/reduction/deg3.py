@@ -7,7 +7,7 @@ class Degree3Distances:
     def __init__(self, steiner, us, ignore):
         self.queue = []
         self.dist = defaultdict(lambda: maxint)
-        self.nb = steiner.graph._adj
+        self.adj = steiner.graph.adj
         self.c_max = 0
         self.ignore = ignore
 
@@ -23,7 +23,7 @@ class Degree3Distances:
             return limit
 
         queue = self.queue
-        nb = self.nb
+        adj = self.adj
         dist = self.dist
         ignore = self.ignore
 
@@ -38,8 +38,8 @@ class Degree3Distances:
             if dist[u] != d:
                 continue
 
-            for v2, w in nb[u].items():
-                d2 = d + w['weight']
+            for v2, w in adj(u):
+                d2 = d + w
 
                 if v2 not in ignore and d2 < dist[v2]:
                     dist[v2] = d2
@@ -61,21 +61,23 @@ class Degree3Reduction:
 
     def reduce(self, steiner, prev_cnt, curr_cnt):
         track = 0
-        nbs = steiner.graph._adj
+        adj = steiner.graph.adj
 
         if not self.enabled:
             return 0
 
         start = time.time()
 
+        # The searches are bounded by distance, not by a number of hops. Changes far away may enable a reduction,
+        # therefore all nodes are checked
         for u in list(steiner.graph.nodes):
             if u not in steiner.terminals and steiner.graph.degree(u) == 3:
-                nb = nbs[u].items()
-                total_edge_sum = sum(dta['weight'] for (x, dta) in nb)
+                nb = adj(u)
+                total_edge_sum = sum(w for (x, w) in nb)
                 ignore = {u}
 
                 # Calc distances, more memory efficient than calculating it all beforehand
-                nbl = nbs[u].keys()
+                nbl = list(steiner.graph.neighbors(u))
                 nbl.sort()
                 c_dist = Degree3Distances(steiner, [nbl[0]], ignore)
                 dist = {(nbl[0], nbl[1]): c_dist.get(nbl[1], total_edge_sum),
@@ -90,9 +92,6 @@ class Degree3Reduction:
                     p, up = nb[i]
                     x, ux = nb[(i + 1) % 3]
                     y, uy = nb[(i + 2) % 3]
-                    up = up['weight']
-                    ux = ux['weight']
-                    uy = uy['weight']
 
                     xp = dist[(min(x, p), max(x, p))]
                     yp = dist[(min(y, p), max(y, p))]
@@ -120,8 +119,7 @@ class Degree3Reduction:
 
                             c_dist = Degree3Distances(steiner, [x, y], ignore)
                             ps = []
-                            for q, pq in nbs[p].items():
-                                pq = pq['weight']
+                            for q, pq in adj(p):
                                 if len(ps) < 2 and q not in ignore \
                                         and c_dist.get(q, max(up, pq) + 1) > max(up, pq):
                                     ps.append((q, pq))
@@ -150,7 +148,7 @@ class Degree3Reduction:
     def sub_dijkstra(self, steiner, us, v, ignore, limit):
         queue = []
         dist = defaultdict(lambda: maxint)
-        nb = steiner.graph._adj
+        adj = steiner.graph.adj
 
         for u in us:
             queue.append((0, u))
@@ -168,8 +166,8 @@ class Degree3Reduction:
             if dist[u] != d:
                 continue
 
-            for v2, w in nb[u].items():
-                d2 = d + w['weight']
+            for v2, w in adj(u):
+                d2 = d + w
 
                 if d2 < limit and v2 not in ignore and d2 < dist[v2]:
                     dist[v2] = d2
@@ -18,11 +18,14 @@ class DegreeReduction:
         track = len(steiner.graph.edges)
         t_cnt = 0
 
-        old = maxint
-
-        while old > len(steiner.graph.nodes):
-            old = len(steiner.graph.nodes)
-            for n in list(steiner.graph.nodes):
+        # Only nodes around changes since the last run can be reduced
+        nodes = steiner.dirty_nodes(self)
+        if nodes is None:
+            nodes = steiner.graph.nodes
+
+        while len(nodes) > 0:
+            position = steiner.journal_position()
+            for n in list(nodes):
                 if not steiner.graph.has_node(n):
                     continue
 
@@ -33,28 +36,24 @@ class DegreeReduction:
                         steiner.remove_node(n)
                     # Terminals of degree 1 => Simply contract
                     elif self._ran:
-                        nb = next(steiner.graph.neighbors(n))
-                        self._contracted.append((n, nb, steiner.graph[n][nb]['weight']))
+                        nb, w = steiner.graph.adj(n)[0]
+                        self._contracted.append((n, nb, w))
                         steiner.move_terminal(n, nb)
                         steiner.remove_node(n)
                         t_cnt += 1
 
                 # Nodes of degree 2 => merge
                 elif dg == 2 and n not in steiner.terminals:
-                    nb = list(steiner.graph.neighbors(n))
-                    w1 = steiner.graph[n][nb[0]]['weight']
-                    w2 = steiner.graph[n][nb[1]]['weight']
+                    (nb1, w1), (nb2, w2) = steiner.graph.adj(n)
 
-                    if steiner.add_edge(nb[0], nb[1], w1+w2):
-                        self._removed[(nb[0], nb[1], w1 + w2)] = [(nb[0], n, w1), (nb[1], n, w2)]
+                    if steiner.add_edge(nb1, nb2, w1+w2):
+                        self._removed[(nb1, nb2, w1 + w2)] = [(nb1, n, w1), (nb2, n, w2)]
                     steiner.remove_node(n)
 
                 # Terminals of higher degree? Merge if the nearest node is a terminal
                 elif self._ran and dg >= 2 and n in steiner.terminals:
                     min_val, min_nb = maxint, None
-                    for n2 in steiner.graph.neighbors(n):
-                        w = steiner.graph[n][n2]['weight']
-
+                    for n2, w in steiner.graph.adj(n):
                         if w < min_val or (w == min_val and n2 in steiner.terminals):
                             min_val, min_nb = w, n2
 
@@ -65,11 +64,16 @@ class DegreeReduction:
                             self._selected.append(e)
                         t_cnt += 1
 
+            nodes = steiner.changed_since(position)
+
         if t_cnt > 0:
             steiner.invalidate_steiner(1)
             steiner.invalidate_dist(1)
             steiner.invalidate_approx(1)
 
+        # Terminals have not been contracted in the first run, all of them have to be checked again
+        if self._ran:
+            steiner.clean(self)
         self._ran = True
         return track - len(steiner.graph.edges)
 
@@ -1,11 +1,13 @@
 from sys import maxint
 from heapq import heappop, heappush, heapify
-from networkx import single_source_dijkstra_path_length, single_source_dijkstra_path, is_connected
+from networkx import single_source_dijkstra_path_length, single_source_dijkstra_path
 from structures import steiner_graph as sg
+from structures.array_graph import ArrayGraph
 import steiner_approximation as sa
 from reduction import degree, long_edges, ntdk, sdc
 from preselection import short_links, nearest_vertex
 from reducer import Reducer
+import deadline
 from collections import deque, defaultdict
 import solver.heuristics.da_graph as dag
 
@@ -107,6 +109,9 @@ class DualAscent:
 
         # Generate solutions
         for i in range(0, len(target_roots)):
+            # Out of time, continue with what we have
+            if results and deadline.expired():
+                break
             r = target_roots[i]
             results.append(algs[1](steiner.graph, r, steiner.terminals))
 
@@ -114,6 +119,10 @@ class DualAscent:
 
         solution_pool = []
 
+        # The remaining steps only improve the upper bound and the reduction, skip them when out of time
+        if deadline.expired():
+            solution_rec_limit = prune_limit = prune_rec_limit = 0
+
         # Tries to recombine solution graphs into a better solution
         if solution_rec_limit > 0:
             solution_rec_idx = list(self.index_generator(0, len(results), solution_rec_limit))
@@ -131,13 +140,16 @@ class DualAscent:
             solution_pool.extend(self.find_new_from_sol(steiner, [solution_pool[i] for i in idx]) for idx in pruned_idx)
 
         # Find best upper bound from all solutions
-        ub = min(solution_pool, key=lambda tr: tr.cost)
-        if ub.cost < steiner.get_approximation().cost:
-            steiner._approximation = ub
+        if solution_pool:
+            ub = min(solution_pool, key=lambda tr: tr.cost)
+            if ub.cost < steiner.get_approximation().cost:
+                steiner._approximation = ub
 
         # Reduce graph
         steiner.lower_bound = results[0][0]
         for c_bnd, c_g, c_root in results:
+            if deadline.expired():
+                break
             self.reduce_graph(steiner, c_g, c_bnd, c_root)
 
         DualAscent.value, DualAscent.graph, DualAscent.root = results[0]
@@ -197,10 +209,18 @@ class DualAscent:
         og = sg.SteinerGraph()
         bnd, g, r = result
 
-        og.terminals = set(steiner.terminals)
+        # The subgraph of the arcs with reduced costs 0 is built in one go, it is much smaller than the graph
+        us = []
+        vs = []
+        ws = []
         for (u, v, d) in g.edges(data='weight'):
             if d == 0:
-                og.add_edge(u, v, steiner.graph[u][v]['weight'])
+                us.append(u)
+                vs.append(v)
+                ws.append(steiner.graph.weight(u, v))
+
+        og.graph = ArrayGraph.from_edges(us, vs, ws)
+        og.terminals = set(steiner.terminals)
 
         sol = sa.SteinerApproximation(og, limit=10)
         red = Reducer(self.reducers(), run_limit=5)
@@ -261,7 +281,7 @@ class DualAscent:
                     if total > bnd:
                         g.remove_node(n)
 
-        if not is_connected(g.graph):
+        if not g.graph.is_connected():
             return None
 
         g.invalidate_steiner(-2)
@@ -278,25 +298,32 @@ class DualAscent:
         dg = sg.SteinerGraph()
         dg.terminals = set(steiner.terminals)
 
+        us = []
+        vs = []
+        ws = []
         for ct in solutions:
             for (u, v, d) in ct.tree.edges(data='weight'):
                 u, v = min(u, v), max(u, v)
-                dg.add_edge(u, v, d)
+                us.append(u)
+                vs.append(v)
+                ws.append(d)
                 alpha[(u, v)] += 1
 
+        dg.graph = ArrayGraph.from_edges(us, vs, ws)
+
         red.reduce(dg)
 
         max_occ = len(solutions)
         for ((u, v), d) in alpha.items():
             if d > 0 and dg.graph.has_edge(u, v):
-                dg.graph[u][v]['weight'] += (1 + (max_occ - d)) * 100
+                dg.set_weight(u, v, dg.graph.weight(u, v) + (1 + (max_occ - d)) * 100)
 
         app = sa.SteinerApproximation(dg, False, limit=10)
 
         for ((u, v), d) in alpha.items():
             if d > 0 and dg.graph.has_edge(u, v):
                 modifier = (1 + (max_occ - d)) * 100
-                dg.graph[u][v]['weight'] -= modifier
+                dg.set_weight(u, v, dg.graph.weight(u, v) - modifier)
                 if app.tree.has_edge(u, v):
                     app.tree[u][v]['weight'] -= modifier
 
@@ -323,8 +350,11 @@ class DualAscent:
                     u, v = pths[t][i-1], pths[t][i]
                     u, v = min(u, v), max(u, v)
                     alpha[(u, v)].add(r)
-                    if not dg.graph.has_edge(u, v):
-                        dg.add_edge(u, v, steiner.graph[u][v]['weight'])
+
+        # Every edge on one of the paths
+        edges = alpha.keys()
+        dg.graph = ArrayGraph.from_edges([u for (u, _) in edges], [v for (_, v) in edges],
+                                         [steiner.graph.weight(u, v) for (u, v) in edges])
 
         red.reduce(dg)
 
@@ -332,13 +362,13 @@ class DualAscent:
         alpha = {(u, v): len(d) for ((u, v), d) in alpha.items()}
         for ((u, v), d) in alpha.items():
             if d > 0 and dg.graph.has_edge(u, v):
-                dg.graph[u][v]['weight'] += (1 + (max_occ - d)) * 100
+                dg.set_weight(u, v, dg.graph.weight(u, v) + (1 + (max_occ - d)) * 100)
 
         app = sa.SteinerApproximation(dg, False,  limit=10)
         for ((u, v), d) in alpha.items():
             if d > 0 and dg.graph.has_edge(u, v):
                 modifier = (1 + (max_occ - d)) * 100
-                dg.graph[u][v]['weight'] -= modifier
+                dg.set_weight(u, v, dg.graph.weight(u, v) - modifier)
                 if app.tree.has_edge(u, v):
                     app.tree[u][v]['weight'] -= modifier
 
@@ -559,8 +589,14 @@ class DualAscent:
         push = heappush
         limit = 0
         active = set(ts)
+        cnt = 0
 
         while queue:
+            # Every intermediate state is a valid dual solution, stop early when out of time
+            cnt += 1
+            if cnt & 63 == 0 and deadline.expired():
+                break
+
             _, t = pop(queue)
 
             # BFS search of cut
@@ -701,12 +737,16 @@ class DualAscent:
     @staticmethod
     def calc5(g, root, ts):
         dg = dag.DaGraph(g, root)
-        queue = [(0, t) for t in ts if t != root]
+        return DualAscent.ascend5(dg, [t for t in ts if t != root], set(ts), 0)
+
+    @staticmethod
+    def ascend5(dg, ts, active, limit):
+        """Dual ascent on the reduced costs of dg, starting with the bound limit. The cut of a terminal in ts grows
+        until it reaches another node in active, active must contain ts and the root. Returns the same as calc5"""
+        queue = [(0, t) for t in ts]
         nb = dg.weights
         pop = heappop
         push = heappush
-        limit = 0
-        active = set(ts)
 
         while queue:
             _, t = pop(queue)
@@ -773,7 +813,7 @@ class DualAscent:
             if not t_found:
                 push(queue, (len([(u, v) for (u, v) in in_edges if v not in cut]), t))
 
-        return limit, dg, root
+        return limit, dg, dg.r
 
 DualAscent.root = None
 DualAscent.graph = None
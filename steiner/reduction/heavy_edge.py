@@ -19,10 +19,10 @@ class HeavyEdge:
         track = 0
 
         self._ran = True
-        nbs = steiner.graph._adj
+        adj = steiner.graph.adj
 
         for t in steiner.terminals:
-            nb = nbs[t].items()
+            nb = adj(t)
 
             if len(nb) < 2:
                 continue
@@ -32,9 +32,9 @@ class HeavyEdge:
             # Incident edges must have the same weight
             for (n, d) in nb:
                 if c_w is None:
-                    c_w = d['weight']
+                    c_w = d
 
-                if d['weight'] != c_w:
+                if d != c_w:
                     c_w = -1
                     break
 
@@ -50,7 +50,7 @@ class HeavyEdge:
 
             for (n, d) in nb:
                 self._adaptions.append((t, n, c_w, max_dist + 1))
-                steiner.graph[t][n]['weight'] = max_dist + 1
+                steiner.set_weight(t, n, max_dist + 1)
 
             track += 1
 
@@ -7,7 +7,7 @@ import heapq as hq
 class LongEdgeReduction:
     """Removes all edges that are longer than the distance to the closest terminal. Also known as PTm test."""
 
-    def __init__(self, delete_equal, threshold=0.01, equal_search_limit=40, terminal_threshold=500):
+    def __init__(self, delete_equal, threshold=0.01, equal_search_limit=40, terminal_threshold=2000):
         self.runs = 0
         self._delete_equal = delete_equal
         self._done = False
@@ -15,6 +15,7 @@ class LongEdgeReduction:
         self._threshold = threshold
         self._counter = maxint / 2
         self._terminal_threshold = terminal_threshold
+        self._table = None
 
     def reduce(self, steiner, prev_cnt, curr_cnt):
         steiner.requires_steiner_dist(1)
@@ -29,8 +30,21 @@ class LongEdgeReduction:
         else:
             self._counter = 0
 
+        # As long as the steiner distances have not been recalculated, only edges around changes need checking.
+        # Equal edges are checked by a search around the edge
+        table = steiner.get_steiner_table()
+        edges = None
+        if table is self._table:
+            if self._delete_equal:
+                edges = steiner.dirty_edges(self)
+            else:
+                nodes = steiner.dirty_nodes(self)
+                edges = None if nodes is None else steiner.incident_edges(nodes)
+        if edges is None:
+            edges = steiner.graph.edges(data='weight')
+
         delete = []
-        for (u, v, d) in steiner.graph.edges(data='weight'):
+        for (u, v, d) in edges:
             sl = steiner.get_steiner_lengths(u, v, d)
             if d > sl:
                 delete.append((u, v))
@@ -42,7 +56,7 @@ class LongEdgeReduction:
 
         for t in steiner.terminals:
             for n in list(steiner.graph.neighbors(t)):
-                if steiner.graph[n][t]['weight'] > steiner.get_lengths(t, n):
+                if steiner.graph.weight(n, t) > steiner.get_lengths(t, n):
                     steiner.remove_edge(n, t)
 
         if self._delete_equal and min(curr_cnt, prev_cnt) == 0 and len(steiner.graph.edges) / len(steiner.graph.nodes) < 10:
@@ -51,6 +65,9 @@ class LongEdgeReduction:
                         d >= ntdk.NtdkReduction.modified_dijkstra(steiner, u, v, d + 1, self._equal_search_limit, True):
                     steiner.remove_edge(u, v)
 
+        steiner.clean(self)
+        self._table = table
+
         result = track - len(steiner.graph.edges)
         if result > 0:
             steiner.invalidate_dist(-1)
@@ -59,16 +76,16 @@ class LongEdgeReduction:
         return result
 
     def exact_reduce(self, steiner):
-        nbs = steiner.graph._adj
+        nbs = steiner.graph.adj
         delete = []
 
         for u in steiner.graph.nodes:
             adj = []
             c_max = 0
-            for (v, w) in nbs[u].items():
+            for (v, w) in nbs(u):
                 if u < v:
                     adj.append(v)
-                    c_max = max(c_max, w['weight'])
+                    c_max = max(c_max, w)
 
             dist = defaultdict(lambda: maxint)
             dist[u] = 0
@@ -90,14 +107,14 @@ class LongEdgeReduction:
                             dist[t] = d2
                             hq.heappush(queue, (d2, t))
                 else:
-                    for (v, w) in nbs[n].items():
-                        d2 = d + w['weight']
+                    for (v, w) in nbs(n):
+                        d2 = d + w
                         if d2 < c_max and d2 < dist[v]:
                             dist[v] = d2
                             hq.heappush(queue, (d2, v))
 
             for v in adj:
-                if steiner.graph[u][v]['weight'] > dist[v]:
+                if steiner.graph.weight(u, v) > dist[v]:
                     delete.append((u, v))
 
         for u, v in delete:
@@ -8,7 +8,7 @@ import time
 class NtdkReduction:
     """ Removes all edges that are longer than the distance to the closest terminal """
 
-    def __init__(self, restricted, threshold=0.01, search_limit=40, only_last=False, max_degree=4, terminal_limit=500):
+    def __init__(self, restricted, threshold=0.01, search_limit=40, only_last=False, max_degree=4, terminal_limit=2000):
         self._removed = {}
         self._restricted = restricted
         self._enabled = True
@@ -21,7 +21,7 @@ class NtdkReduction:
         self._terminal_limit = terminal_limit
 
     def reduce(self, steiner, prev_cnt, curr_cnt):
-        # get_steiner_length is k^2 runtime. If there are too many terminals, it becomes very slow, avoid this here
+        # get_steiner_length needs a k^2 table. If there are too many terminals, it becomes too large, avoid this here
         if len(steiner.graph.edges) / len(steiner.graph.nodes) > 10 or \
                 (self._restricted and self._terminal_limit < len(steiner.terminals)):
             return 0
@@ -41,12 +41,12 @@ class NtdkReduction:
 
         start = time.time()
         track = len(steiner.graph.edges)
-        nbs = steiner.graph._adj
+        adj = steiner.graph.adj
 
         for n in list(steiner.graph.nodes):
             if n not in steiner.terminals and 2 < steiner.graph.degree(n) <= self._max_degree:
-                nb = nbs[n].items()
-                total_edge_sum = sum(dta['weight'] for (x, dta) in nb)
+                nb = adj(n)
+                total_edge_sum = sum(w for (x, w) in nb)
 
                 # Calc distances, more memory efficient than calculating it all beforehand
                 if not self._restricted:
@@ -76,8 +76,8 @@ class NtdkReduction:
 
                             for i in xrange(0, len(nb)):
                                 if i != set_num:
-                                    n1, dta = nb[i]
-                                    edge_sum += dta['weight']
+                                    n1, w = nb[i]
+                                    edge_sum += w
 
                                     for j in xrange(i + 1, len(nb)):
                                         if j != set_num:
@@ -94,8 +94,8 @@ class NtdkReduction:
                             if bin(power_set).count("1") >= 3:
                                 for i in xrange(0, len(nb)):
                                     if ((1 << i) & power_set) > 0:
-                                        n1, dta = nb[i]
-                                        edge_sum = edge_sum + dta['weight']
+                                        n1, w = nb[i]
+                                        edge_sum = edge_sum + w
 
                                         for j in xrange(i + 1, len(nb)):
                                             if ((1 << j) & power_set) > 0:
@@ -112,8 +112,8 @@ class NtdkReduction:
                 if true_for_all:
                     # Introduce artificial edges
                     for (n1, n2) in ((x, y) for (x, tt1) in nb for (y, tt2) in nb if y > x):
-                        c1 = steiner.graph[n][n1]['weight']
-                        c2 = steiner.graph[n][n2]['weight']
+                        c1 = steiner.graph.weight(n, n1)
+                        c2 = steiner.graph.weight(n, n2)
                         if c1 + c2 <= dist[(n1, n2)]:
                             if steiner.add_edge(n1, n2, c1 + c2):
                                 self._removed[(n1, n2, c1 + c2)] = [(n, n1, c1), (n, n2, c2)]
@@ -173,7 +173,7 @@ class NtdkReduction:
                     sd = min(sd, scanned1[n] + scanned2[n])
 
         if not restrict and steiner.graph.has_edge(u, v):
-            sd = min(sd, steiner.graph[u][v]['weight'])
+            sd = min(sd, steiner.graph.weight(u, v))
 
         return sd
 
@@ -183,12 +183,11 @@ class NtdkReduction:
         scanned = defaultdict(lambda: maxint)
 
         scanned_edges = 0
-        nb = steiner.graph._adj
+        adj = steiner.graph.adj
 
         # Expand first node explicitly here, so no check in the loop is required to exclude edge
-        for n2, dta in nb[u].items():
+        for n2, c in adj(u):
             if n2 != v:
-                c = dta['weight']
                 hq.heappush(queue, [c, n2])
                 scanned[n2] = c
 
@@ -203,12 +202,12 @@ class NtdkReduction:
             elif n in steiner.terminals or n == v or n == u:
                 continue
 
-            for n2, dta in nb[n].items():
+            for n2, w in adj(n):
                 scanned_edges += 1
                 if scanned_edges > depth_limit:
                     break
 
-                cost = c_val[0] + dta['weight']
+                cost = c_val[0] + w
 
                 if (n2 not in scanned or cost < scanned[n2]) and cost <= cut_off:
                     scanned[n2] = cost
@@ -13,12 +13,20 @@ class SdcReduction:
 
         track = len(steiner.graph.edges)
 
+        # Only check the edges around changes since the last run
+        edges = steiner.dirty_edges(self)
+        if edges is None:
+            edges = steiner.graph.edges(data='weight')
+
         count = 0
-        for (u, v, d) in steiner.graph.edges(data='weight'):
-            if d >= NtdkReduction.modified_dijkstra(steiner, u, v, d + 1, self._search_limit, True):
+        for (u, v, d) in edges:
+            if steiner.graph.has_edge(u, v) and \
+                    d >= NtdkReduction.modified_dijkstra(steiner, u, v, d + 1, self._search_limit, True):
                 steiner.remove_edge(u, v)
                 count += 1
 
+        steiner.clean(self)
+
         if count > 0:
             steiner.invalidate_dist(+1)
 
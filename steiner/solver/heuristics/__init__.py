@@ -1 +1 @@
-__all__ = ["mst_heuristic", "da_heuristic", "da_graph"]
+__all__ = ["mst_heuristic", "da_heuristic", "da_graph", "da_prefetch"]
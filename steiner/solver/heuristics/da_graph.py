@@ -1,3 +1,4 @@
+from copy import copy
 from heapq import heappush, heappop
 
 
@@ -7,10 +8,15 @@ class DaGraph:
         # Weights is implicitly the list of predecessors
         self.weights = {}
         self.r = r
-        nb = g._adj
-
         for n in g.nodes:
-            self.weights[n] = {n2: w['weight'] for n2, w in nb[n].items()}
+            self.weights[n] = dict(g.adj(n))
+
+    def copy(self):
+        """Returns a copy with its own reduced costs"""
+        dg = copy(self)
+        dg.weights = {n: w.copy() for (n, w) in self.weights.items()}
+
+        return dg
 
     def calc_costs(self):
         fixed = set()
@@ -38,3 +44,31 @@ class DaGraph:
 
         return dist
 
+    def calc_terminal_costs(self, ts):
+        """Calculates the costs from every node to the closest terminal in ts, following the arcs"""
+        fixed = set()
+        dist = {}
+
+        q = []
+
+        for t in ts:
+            heappush(q, (0, t))
+            dist[t] = 0
+
+        while q:
+            d, v = heappop(q)
+
+            if v in fixed:
+                continue
+            fixed.add(v)
+
+            # The predecessors of v
+            for u, c in self.weights[v].items():
+                cst = c + d
+
+                if u not in dist or cst < dist[u]:
+                    dist[u] = cst
+                    heappush(q, (cst, u))
+
+        return dist
+
@@ -1,17 +1,32 @@
+from sys import maxint
+from array import array
 import reduction.dual_ascent as da
 from networkx import single_source_dijkstra_path_length
+from structures.bound_cache import BoundCache
+from da_prefetch import DaPrefetcher
 
 
 class DaHeuristic:
-    def __init__(self, steiner):
+    def __init__(self, steiner, memory_limit=256, workers=0):
         self.steiner = steiner
         self.solver = None
-        self.calculated = {}
+        # The bounds per set, indexed by node. The memory limit is in MB, the bounds for unrooted trees are only
+        # needed during the final steps and get a small share
+        self.calculated = BoundCache(memory_limit * 1024 * 1024 * 5 / 8)
+        self.unrooted = BoundCache(memory_limit * 1024 * 1024 / 8)
+        # The reduced costs per set, dual ascent for a set with one more terminal continues from them
+        self.states = BoundCache(memory_limit * 1024 * 1024 / 4)
+        self._state_size = None
+        # Number of processes that calculate bounds in advance, 0 to calculate all bounds when needed
+        self.workers = workers
+        self._prefetcher = None
+        # The solver asks for the same set many times in a row, this skips the cache
+        self._last_set = None
+        self._last_bounds = None
         self.upper_bound = {}
-        self._qry_cnt = 0
-        self._hit_at = {}
         self._closest = None
         self._method = None
+        self._full = None
 
     """Heuristic that uses the MST of the terminals in the distance graph (halved) as a lower bound"""
     def calculate(self, n, set_id):
@@ -19,43 +34,119 @@ class DaHeuristic:
         if set_id == 0:
             return self.steiner.get_lengths(self.solver.root_node, n)
 
-        self._qry_cnt += 1
+        if set_id == self._last_set:
+            return self._last_bounds[n]
 
         # Load precalculated value or calculate if not existing
-        try:
-            d = self.calculated[set_id][n]
-            self._hit_at[set_id] = self._qry_cnt
+        bounds = self.calculated.get(set_id)
+        if bounds is None:
+            bounds = self.precalc(set_id)
+        elif self._prefetcher is not None:
+            self._prefetcher.used(set_id)
 
-            return d
-        except KeyError:
-            self.precalc(set_id)
-            self._hit_at[set_id] = self._qry_cnt
-            d = self.calculated[set_id][n]
+        self._last_set = set_id
+        self._last_bounds = bounds
 
-        # Clean up to save memory
-        if self._qry_cnt % 25000 == 0:
-            for (s, c) in self._hit_at.items():
-                if self._qry_cnt - c > 25000:
-                    self._hit_at.pop(s)
-                    self.calculated.pop(s)
+        return bounds[n]
 
-        return d
+    def calculate_unrooted(self, n, set_id):
+        """Lower bound for a tree that contains n and the terminals in the set, but not necessarily the root"""
+        bounds = self.unrooted.get(set_id)
+        if bounds is not None:
+            return bounds[n]
+
+        ts = self.solver.to_list(set_id)
+        if len(ts) == 1:
+            return self.steiner.get_lengths(ts[0], n)
+
+        # Use one of the terminals as the root
+        bounds = self._bounds(ts[0], set(ts))
+        self.unrooted.put(set_id, bounds)
+
+        return bounds[n]
 
     def precalc(self, set_id):
-        r = self.solver.root_node
+        if self.workers > 0:
+            if self._prefetcher is None:
+                # Stays after closing, for the statistics
+                self._prefetcher = DaPrefetcher(self.solver, self.workers, self.calculated)
+
+            bounds = self._prefetcher.get(set_id)
+            self._prefetcher.queried(set_id)
+            if bounds is not None:
+                return bounds
+
+        root = self.solver.root_node
+        # The bounds may have been evicted while the reduced costs are still known
+        result = self.states.peek(set_id)
+        known = result is not None
+
+        # The cuts of the smaller set are still valid for the larger one, only the cut of the new terminal has to grow
+        rest = set_id if not known else 0
+        while rest:
+            b = rest & -rest
+            rest ^= b
+            state = self.states.get(set_id ^ b)
+            if state is not None:
+                t = self.solver.terminal_ids[b]
+                result = da.DualAscent.ascend5(state[1].copy(), [t], {t, root}, state[0])
+                break
+
+        if result is None:
+            ts = self.solver.to_set(set_id)
+            ts.add(root)
+            result = self._ascent(root, ts)
+
+        if not known:
+            if self._state_size is None:
+                # Estimate for the dictionaries with the reduced costs
+                self._state_size = sum(280 + 64 * len(w) for w in result[1].weights.values())
+            self.states.put(set_id, (result[0], result[1]), self._state_size)
+
+        bounds = self._to_bounds(result)
+        self.calculated.put(set_id, bounds)
 
+        return bounds
+
+    def stats(self):
+        """Returns lines that describe the use of the caches"""
+        lines = ["Bounds: " + self.calculated.stats(), "Unrooted bounds: " + self.unrooted.stats(),
+                 "Reduced costs: " + self.states.stats()]
+        if self._prefetcher is not None:
+            lines.append("Prefetch: " + self._prefetcher.stats())
+
+        return lines
+
+    def close(self):
+        """Stops the worker processes"""
+        if self._prefetcher is not None:
+            self._prefetcher.close()
+
+    def _bounds(self, r, ts):
+        """Calculates the lower bounds for trees that contain the terminals ts and a node using dual ascent"""
+        return self._to_bounds(self._ascent(r, ts))
+
+    def full_ascent(self, root):
+        """Dual ascent for all terminals, calculated once. The solver uses the reduced costs as well"""
+        if self._full is None or self._full[2] != root:
+            self._full = da.DualAscent.calc5(self.steiner.graph, root, self.steiner.terminals)
+
+        return self._full
+
+    def _ascent(self, r, ts):
         if self._method is None:
-            result1 = da.DualAscent.calc5(self.steiner.graph, r, self.steiner.terminals)
-            result2 = da.DualAscent.calc4(self.steiner.graph, r, self.steiner.terminals)
+            root = self.solver.root_node
+            result1 = self.full_ascent(root)
+            result2 = da.DualAscent.calc4(self.steiner.graph, root, self.steiner.terminals)
             self._method = da.DualAscent.calc4 if result2[0] >= result1[0] else da.DualAscent.calc5
             self._method = da.DualAscent.calc5
 
-        ts = self.solver.to_set(set_id)
-        ts.add(self.solver.root_node)
-
-        result = self._method(self.steiner.graph, r, ts)
+        return self._method(self.steiner.graph, r, ts)
 
-        nodes = {}
+    def _to_bounds(self, result):
+        """Converts the result of dual ascent into the bounds per node"""
+        # Nodes that cannot be reached get the maximum
+        nodes = array('l', [maxint]) * (self.solver.max_node + 1)
         bnd = result[0]
         # Do not add the distance to the closest terminal. As n is the linking node between the partial results
         # it may be a leaf for the heuristic!
@@ -63,4 +154,4 @@ class DaHeuristic:
         #for (n, d) in single_source_dijkstra_path_length(result[1], r).items():
             nodes[n] = d + bnd
 
-        self.calculated[set_id] = nodes
+        return nodes
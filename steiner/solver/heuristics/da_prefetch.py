@@ -0,0 +1,154 @@
+from sys import maxint
+from array import array
+from heapq import heappush, heappop
+from multiprocessing import Pool
+from multiprocessing.sharedctypes import RawArray
+import reduction.dual_ascent as da
+
+"""Calculates the dual ascent bounds of sets in worker processes, before the solver asks for them. The workers write
+the bounds into slots of shared memory, only the slot number is sent back"""
+
+# The state of a worker process, set once when the process starts
+_graph = None
+_root = None
+_shared = None
+_width = None
+
+
+def _init_worker(graph, root, shared, width):
+    global _graph, _root, _shared, _width
+    _graph = graph
+    _root = root
+    _shared = shared
+    _width = width
+
+
+def _calculate(ts, slot):
+    """Calculates the bounds for the terminals ts (including the root) and stores them in the slot"""
+    result = da.DualAscent.calc5(_graph, _root, ts)
+    bnd = result[0]
+
+    bounds = array('l', [maxint]) * _width
+    for (n, d) in result[1].calc_costs().items():
+        bounds[n] = d + bnd
+
+    offset = slot * _width
+    _shared[offset:offset + _width] = bounds.tolist()
+
+    return slot
+
+
+class DaPrefetcher:
+    """Keeps the workers busy with the sets that are likely to be queried next. Sets with fewer terminals are queried
+    first by the solver, so the candidates are ordered by size. Every queried set adds the sets that extend it by the
+    closest terminal of one of its terminals"""
+
+    def __init__(self, solver, workers, cache):
+        self.solver = solver
+        self.cache = cache
+        self.width = solver.max_node + 1
+        # Two tasks per worker, so no worker waits for the solver to collect a result
+        slots = 2 * workers
+        self._shared = RawArray('l', slots * self.width)
+        self._free = range(0, slots)
+        self._pending = {}
+        self._candidates = []
+        self._seen = set()
+        self._count = 0
+        # Sets calculated by the workers, how many of them were queried and how many queries had to wait
+        self.prefetched = 0
+        self.served = 0
+        self.waited = 0
+        self._unused = set()
+        self._closed = False
+        self._pool = Pool(workers, _init_worker, (solver.steiner.graph, solver.root_node, self._shared, self.width))
+
+        for t in solver.terminals:
+            self._add(solver.terminal_set_ids[t])
+        for t in solver.terminals:
+            self.queried(solver.terminal_set_ids[t])
+
+    def close(self):
+        if not self._closed:
+            self._closed = True
+            self._pool.terminate()
+            self._pool.join()
+
+    def stats(self):
+        return "{} sets calculated by the workers, {} of them queried, {} queries waited".format(
+            self.prefetched, self.served, self.waited)
+
+    def get(self, set_id):
+        """Returns the bounds for the set if they are calculated or pending, otherwise None. Finished results are
+        moved into the cache. The caller already counted the query as a miss of the cache"""
+        self._collect()
+        bounds = self.cache.peek(set_id)
+
+        if bounds is None and set_id in self._pending:
+            self.waited += 1
+            self._pending[set_id][0].wait()
+            self._collect()
+            bounds = self.cache.peek(set_id)
+
+        if bounds is not None:
+            self.used(set_id)
+
+        return bounds
+
+    def used(self, set_id):
+        """Counts the first query for a set calculated by the workers"""
+        if set_id in self._unused:
+            self._unused.remove(set_id)
+            self.served += 1
+
+    def queried(self, set_id):
+        """Adds the sets that extend the set by one terminal, that is close to the set"""
+        self._seen.add(set_id)
+        outside = self.solver.order_mask ^ set_id
+        rest = set_id
+        while rest:
+            b = rest & -rest
+            rest ^= b
+            order = self.solver.terminal_order(self.solver.terminal_ids[b])
+            i = order.first(outside)
+            bit = self.solver.terminal_set_ids[order.nodes[i]]
+            # Sets with the root are not queried
+            if bit != 0:
+                self._add(set_id | bit)
+
+        self._submit()
+
+    def _add(self, set_id):
+        if set_id not in self._seen:
+            self._seen.add(set_id)
+            self._count += 1
+            heappush(self._candidates, (bin(set_id).count("1"), self._count, set_id))
+
+    def _submit(self):
+        while self._free and self._candidates:
+            _, _, set_id = heappop(self._candidates)
+            if set_id in self.cache:
+                continue
+            ts = self.solver.to_set(set_id)
+            ts.add(self.solver.root_node)
+            slot = self._free.pop()
+            self._pending[set_id] = (self._pool.apply_async(_calculate, (ts, slot)), slot)
+
+    def _collect(self):
+        done = [(s, r, slot) for (s, (r, slot)) in self._pending.items() if r.ready()]
+        for (set_id, result, slot) in done:
+            self._pending.pop(set_id)
+            self._free.append(slot)
+            # Raises the exception of the worker, if any
+            result.get()
+
+            bounds = array('l')
+            size = self.width * bounds.itemsize
+            bounds.fromstring(buffer(self._shared)[slot * size:(slot + 1) * size])
+            if set_id not in self.cache:
+                self.cache.put(set_id, bounds)
+                self.prefetched += 1
+                self._unused.add(set_id)
+
+        if done:
+            self._submit()
@@ -1,13 +1,35 @@
 from sys import maxint
+from array import array
 
 
 class MstHeuristic:
-    """Heuristic that uses the MST of the terminals in the distance graph (halved) as a lower bound"""
-    def __init__(self, steiner):
+    """Heuristic that uses the MST of the terminals in the distance graph (halved) as a lower bound.
+
+    The sets use the bits of the solver, with one more bit for the root. The costs are stored in an array indexed by
+    the set, or in a bounded dictionary if there are too many sets. The trees of recent sets are kept, so the MST of a
+    set with one more terminal can be derived in linear time"""
+    def __init__(self, steiner, array_limit=1 << 20, tree_limit=5000):
         self.steiner = steiner
-        self.mst = {}
         self.solver = None
         self.desc = None
+        self.array_limit = array_limit
+        self.tree_limit = tree_limit
+        self.mst = None
+        self.trees = {}
+        self.root_bit = None
+        self.bit_nodes = None
+
+    def _init(self):
+        """Creates the tables, the solver is not known on creation"""
+        # The node for every bit, the last one is the root
+        self.bit_nodes = list(self.solver.terminals)
+        self.bit_nodes.append(self.solver.root_node)
+        self.root_bit = 1 << len(self.solver.terminals)
+
+        if 2 * self.root_bit <= self.array_limit:
+            self.mst = array('l', [-1]) * (2 * self.root_bit)
+        else:
+            self.mst = {}
 
     def calculate(self, n, set_id):
         length = self.steiner.get_lengths
@@ -16,37 +38,98 @@ class MstHeuristic:
         if set_id == 0:
             return length(self.solver.root_node, n)
 
-        # Calculate MST costs
+        cost = self.calc_mst(set_id)
+
+        # Find the two closest terminals, the root counts as part of the set
+        order = self.solver.terminal_order(n)
+        mask = set_id | self.root_bit
+
+        return (order.dists[order.first(mask)] + order.dists[order.second(mask)] + cost) / 2
+
+    def calculate_unrooted(self, n, set_id):
+        """Same bound for a tree that contains n and the terminals in the set, but not necessarily the root"""
+        cost = self.calc_mst(set_id, False)
+
+        order = self.solver.terminal_order(n)
+        mask = set_id & self.solver.max_set
+        first = order.dists[order.first(mask)]
+        second = order.second(mask)
+
+        # A single terminal is just connected to n
+        if second < 0:
+            return first
+
+        return (first + order.dists[second] + cost) / 2
+
+    def full_ascent(self, root):
+        """This heuristic does not use dual ascent"""
+        return None
+
+    def stats(self):
+        """Returns lines that describe the use of the caches, there are no statistics for this heuristic"""
+        return []
+
+    def close(self):
+        pass
+
+    def calc_mst(self, set_id, rooted=True):
+        """Returns the costs of a MST of the terminals in the set and, if rooted, the root"""
+        if self.bit_nodes is None:
+            self._init()
+
+        if rooted:
+            set_id |= self.root_bit
+
         try:
             cost = self.mst[set_id]
+            if cost >= 0:
+                return cost
         except KeyError:
-            cost = self.calc_mst(set_id)
-            self.mst[set_id] = cost
+            pass
+
+        # Derive from a set with one terminal less, if its tree is known
+        tree = None
+        rest = set_id
+        while rest:
+            b = rest & -rest
+            rest ^= b
+            parent = self.trees.get(set_id ^ b)
+            if parent:
+                tree = self.add_node(parent, self.bit_nodes[b.bit_length() - 1])
+                break
 
-        # Find minimum pairwise distance
-        min_val = []
+        if tree is None:
+            tree = self.prim(set_id)
 
-        for (t, l) in self.steiner.get_closest(n):
-            ids = self.solver.terminal_set_ids[t]
-            if ids == 0 or (ids & set_id) > 0:
-                min_val.append(l)
+        cost = sum(c for (c, _, _) in tree)
 
-            if len(min_val) == 2:
-                break
+        # Only recent trees are kept, the costs are kept if there is room for all sets
+        if len(self.trees) >= self.tree_limit:
+            self.trees.clear()
+        self.trees[set_id] = tree
 
-        return (min_val[0] + min_val[1] + cost) / 2
+        if isinstance(self.mst, dict) and len(self.mst) >= self.array_limit:
+            self.mst.clear()
+        self.mst[set_id] = cost
+
+        return cost
+
+    def prim(self, set_id):
+        """Calculate the MST using Prim's algorithm. Returns the edges as tuples (cost, node, node)"""
+        ts = []
+        while set_id:
+            b = set_id & -set_id
+            set_id ^= b
+            ts.append(self.bit_nodes[b.bit_length() - 1])
 
-    def calc_mst(self, set_id):
-        """Calculate the costs of a MST using Prim's algorithm"""
-        ts = self.solver.to_list(set_id)
-        ts.append(self.solver.root_node)
         # use prim since we have a full graph
         length = self.steiner.get_lengths
         min_edge = [maxint for _ in ts]
+        min_pred = [None for _ in ts]
         taken = [False for _ in ts]
+        edges = []
 
         idx = -1
-        sum_edges = 0
 
         # Init
         min_edge[0] = 0
@@ -62,11 +145,62 @@ class MstHeuristic:
             # Add vertex to MST
             taken[idx] = True
             min_edge[idx] = maxint
-            sum_edges += val
+            if min_pred[idx] is not None:
+                edges.append((val, ts[min_pred[idx]], ts[idx]))
 
             # Adjust minimum edges
             for k in range(0, len(ts)):
                 if not taken[k]:
-                    min_edge[k] = min(min_edge[k], length(ts[idx], ts[k]))
+                    c = length(ts[idx], ts[k])
+                    if c < min_edge[k]:
+                        min_edge[k] = c
+                        min_pred[k] = idx
+
+        return edges
+
+    def add_node(self, tree, z):
+        """Calculates the MST after adding the node z to the tree (Chin and Houck). The tree is traversed bottom up,
+        for every node the heaviest edge on the path to z is known. Connecting a child closes a cycle, of which the
+        heaviest edge is removed"""
+        length = self.steiner.get_lengths
 
-        return sum_edges
+        adj = {}
+        for (c, u, v) in tree:
+            adj.setdefault(u, []).append((v, c))
+            adj.setdefault(v, []).append((u, c))
+
+        # Order the nodes such that every node is after its parent
+        root = tree[0][1]
+        order = [(root, None, 0)]
+        parent = {root: None}
+        i = 0
+        while i < len(order):
+            u = order[i][0]
+            for (v, c) in adj[u]:
+                if v not in parent:
+                    parent[v] = u
+                    order.append((v, u, c))
+            i += 1
+
+        heaviest = {}
+        for (u, _, _) in order:
+            heaviest[u] = (length(u, z), u, z)
+
+        # The edges that are not removed make up the new tree
+        edges = []
+        for (u, p, c) in reversed(order):
+            if p is None:
+                edges.append(heaviest[u])
+                continue
+
+            e = (c, u, p)
+            h = heaviest[u]
+            if h < e:
+                e, h = h, e
+            # The lighter one stays in any case, the heavier one competes with the path of the parent. The heaviest
+            # of the cycle is removed, the other one is the heaviest on the new path to z
+            edges.append(e)
+            if h < heaviest[p]:
+                heaviest[p] = h
+
+        return edges
@@ -1,18 +1,33 @@
 from itertools import chain
 from sys import maxint
-from networkx import Graph
-from structures import bounded_structures as bs, d_heap as dh, set_storage as st
+from networkx import Graph, minimum_spanning_tree
+from structures import bounded_structures as bs, d_heap as dh, sparse_buckets as sb
+from structures import set_storage as st, label_table as lt, terminal_order as to
 import reduction.dual_ascent as da
+import deadline
 
 
 class Solver2kConfig:
     """This class contains the parameters for the solver"""
-    def __init__(self, heap_width=16, bucket_limit=5000, root_choice=True, use_store=True, use_da=True):
+    def __init__(self, heap_width=16, bucket_limit=5000, root_choice=True, use_store=True, use_da=True,
+                 sparse_limit=1000000, memory_limit=0, half_sets=False, use_dominance=False, use_reduced_costs=True,
+                 workers=0):
         self.heap_width = heap_width
         self.bucket_limit = bucket_limit
+        self.sparse_limit = sparse_limit
+        # In MB, 0 for no limit
+        self.memory_limit = memory_limit
         self.root_choice = root_choice
         self.use_store = use_store
         self.use_da = use_da
+        # Only propagate subsets with up to half of the terminals, see Solver2k
+        self.half_sets = half_sets
+        # Do not expand labels that are dominated by a label for a superset at the same node
+        self.use_dominance = use_dominance
+        # Skip edges that cannot be part of a tree within the bound, according to the reduced costs of dual ascent
+        self.use_reduced_costs = use_reduced_costs
+        # Number of processes that calculate dual ascent bounds in advance
+        self.workers = workers
 
 
 class SolverSetLabelStore:
@@ -24,15 +39,33 @@ class SolverSetLabelStore:
     def append(self, label):
         self._store.add(label)
 
+    def __contains__(self, label):
+        return label in self._store
+
+    def memory(self):
+        """Estimates the memory used in bytes, a set entry and a boxed integer per label"""
+        return 64 * len(self._store)
+
     def find_all(self, label):
         for n in self._store:
             if (n & label) == 0:
                 yield n
 
+    def find_supersets(self, label):
+        for n in self._store:
+            if (n & label) == label and n != label:
+                yield n
+
 
 class Solver2k:
     """Solver that uses a mixture of Dijkstra's algorithm and the Dreyfus-Wagner algorithm to solve the SPG.
-    As proposed in Hougardy2014"""
+    As proposed in Hougardy2014
+
+    With half sets (Erickson, Monma, Veinott), the root is a terminal of its own in the sets. Only sets with at most
+    half of all terminals are moved along edges. Larger sets are merged at a node from smaller ones and the full set
+    is the combination of two labels at the same node. Root the optimal tree at the root and take the deepest node v
+    whose subtree contains more than half of the terminals: every child subtree of v is a small label, and the rest of
+    the tree, that contains the root, is a small label at v"""
 
     def __init__(self, steiner, terminals, heuristics, config):
         self._last_set_id = None
@@ -45,25 +78,54 @@ class Solver2k:
         target_root = None
         if config.root_choice:
             target_root = da.DualAscent.root
-            if target_root is None or not steiner.graph.has_node(target_root):
+            if target_root is None or target_root not in steiner.terminals:
                 target_root = steiner.get_approximation().get_root(self.steiner)
 
         self.root_node = self.terminals.pop(self.terminals.index(target_root)) \
             if target_root is not None else self.terminals.pop()
         self.max_set = (1 << len(self.terminals)) - 1
+        # Half sets: the bit of the root, the set of all terminals and the maximum size of sets moved along edges
+        self.half_sets = config.half_sets
+        self.root_bit = (1 << len(self.terminals)) if self.half_sets else 0
+        self.full_set = self.max_set | self.root_bit if self.half_sets else -1
+        self.half_size = (len(self.terminals) + 1) / 2
+        # With half sets, large sets are not moved along edges and cannot replace smaller ones
+        self.use_dominance = config.use_dominance and not self.half_sets
         self.prune_dist = {}
         self.prune_bounds = {}
         self.heuristic_function = heuristics
         self.labels = list([None] * (self.max_node + 1))
 
+        # Use the approximation + 1 (otherwise solving will fail if the approximation is correct) as an upper cost
+        # bound. The sets have a bit for every terminal but the root, plus the root bit with half sets
+        self.costs = lt.LabelTable(self.max_node, steiner.get_approximation().cost + 1,
+                                   set_bits=len(self.terminals) + 1)
+
+        # The bucket queues keep the keys in sets, only the heap depends on the size of the keys
         if steiner.get_approximation().cost <= config.bucket_limit:
             self.queue = bs.create_queue(steiner.get_approximation().cost)
-            self.pop = bs.dequeue
-            self.push = bs.enqueue
+            queue_module = bs
+        # Too many buckets to allocate up front, but still many labels per priority
+        elif steiner.get_approximation().cost <= config.sparse_limit:
+            self.queue = sb.create_queue()
+            queue_module = sb
         else:
-            self.queue = dh.create_queue(config.heap_width)
-            self.pop = dh.dequeue
-            self.push = dh.enqueue
+            self.queue = dh.create_queue(config.heap_width, self.costs.wide)
+            queue_module = dh
+        self.pop = queue_module.dequeue
+        self.push = queue_module.enqueue
+        self.queue_size = queue_module.size
+        self.queue_prune = queue_module.prune
+
+        # Labels with higher estimated total costs are not queued. Lowered if a cheaper tree is found or in case
+        # memory runs out
+        self.bound = steiner.get_approximation().cost
+        self.memory_limit = config.memory_limit * 1024 * 1024
+        # The memory used by the stores of the permanent labels, only tracked if there is a limit
+        self.store_memory = 0
+        # Number of labels dropped due to the memory limit, if any then the solution may not be optimal
+        self.dropped = 0
+        self.exhausted = False
 
         # Pre calculate the IDs of the sets with just the terminal
         self.terminal_ids = {}
@@ -73,21 +135,56 @@ class Solver2k:
             self.terminal_set_ids[self.terminals[i]] = 1 << i
         self.terminal_set_ids[self.root_node] = 0
 
-        # Use the approximation + 1 (otherwise solving will fail if the approximation is correct) as an upper cost bound
-        self.costs = list([None] * (self.max_node + 1))
-        steiner.closest_terminals = list([None] * (self.max_node + 1))
-        length = steiner.get_lengths
+        # The terminals of every node in the order of distance, created on first use. The root has a bit of its own
+        self.order_bits = dict(self.terminal_set_ids)
+        self.order_bits[self.root_node] = 1 << len(self.terminals)
+        self.order_mask = (1 << (len(self.terminals) + 1)) - 1
+        self.orders = list([None] * (self.max_node + 1))
 
         for n in self.steiner.graph.nodes:
-            self.labels[n] = st.SetStorage(len(self.terminals)) if config.use_store else SolverSetLabelStore()
-            s_id = 0
-            if n in self.terminals:
-                s_id = 1 << (self.terminals.index(n))
-            self.costs[n] = SolverCosts(s_id, steiner.get_approximation().cost + 1)
+            self.labels[n] = st.create_storage(len(self.terminals) + (1 if self.half_sets else 0)) \
+                if config.use_store else SolverSetLabelStore()
+        for i in range(0, len(self.terminals)):
+            self.costs.set(self.costs.key(self.terminals[i], 1 << i), 0, -1, False)
+        if self.half_sets:
+            self.costs.set(self.costs.key(self.root_node, self.root_bit), 0, -1, False)
+
+        # Calculate the distances to all terminals in one go, the heuristics query the closest terminals per node.
+        # The distances to the root tell which merges can still be completed to a tree cheaper than the bound
+        self.root_distances = steiner.get_terminal_distances().row(self.root_node)
+
+        # The reduced costs are for trees directed away from the root. Sets with the root grow in the other direction.
+        # Only the dual ascent heuristic has them, it calculates them for all terminals anyway
+        self.arcs = None
+        if config.use_reduced_costs and not self.half_sets and len(self.steiner.terminals) > 2:
+            result = heuristics.full_ascent(self.root_node)
+            if result is not None:
+                self.reduced_costs(result[0], result[1])
+
+    def reduced_costs(self, bnd, dg):
+        """Calculates a lower bound for every edge, for trees that contain the edge directed towards the labels. A
+        label moves from n to a neighbor m, in the tree the edge is directed from m to n. The lower bound is the dual
+        ascent bound plus the reduced costs of the path from the root to m, the edge, and the path from n to the
+        closest terminal"""
+        root_dist = dg.calc_costs()
+        terminal_dist = dg.calc_terminal_costs([t for t in self.steiner.terminals if t != self.root_node])
+
+        # Per node the neighbors and the edge weights, sorted by the lower bound
+        self.arc_bounds = list([None] * (self.max_node + 1))
+        for n in self.steiner.graph.nodes:
+            d = terminal_dist.get(n, maxint) + bnd
+            arcs = [(root_dist.get(m, maxint) + dg.weights[n][m] + d, m, w) for (m, w) in self.steiner.graph.adj(n)]
+            arcs.sort()
+            self.arc_bounds[n] = arcs
+
+        self.arcs = list([None] * (self.max_node + 1))
+        self.filter_arcs()
 
-            # Calc closest terminals per node
-            steiner.closest_terminals[n] = [(t, length(t, n)) for t in steiner.terminals]
-            steiner.closest_terminals[n].sort(key=lambda x: x[1])
+    def filter_arcs(self):
+        """Keeps the edges whose lower bound does not exceed the bound"""
+        bound = self.bound
+        for n in self.steiner.graph.nodes:
+            self.arcs[n] = [(m, w) for (b, m, w) in self.arc_bounds[n] if b <= bound]
 
     def solve(self):
         """Solves the instance of the steiner tree problem"""
@@ -99,79 +196,241 @@ class Solver2k:
             return ret, 0
 
         # Initialize queue with partial solutions, containing only the terminals themselves
-        # The queue is keyed by node and terminal subset
+        # The queue uses the same packed keys of terminal subset and node as the label table
+        key = self.costs.key
         for terminal_id in range(0, len(self.terminals)):
-            self.push(self.queue, 0, (1 << terminal_id, self.terminals[terminal_id]))
+            self.push(self.queue, 0, key(self.terminals[terminal_id], 1 << terminal_id))
+        if self.half_sets:
+            self.push(self.queue, 0, key(self.root_node, self.root_bit))
 
         pop = self.pop
-        root_node = self.root_node
-        max_set = self.max_set
-
-        # Start algorithm, finish if the root node is added to the tree with all terminals
+        bits = self.costs.node_bits
+        node_mask = (1 << bits) - 1
+        final_key = key(self.root_node, self.max_set)
+        full_set = self.full_set
+        half_sets = self.half_sets
+        half_size = self.half_size
+        use_dominance = self.use_dominance
+        track_memory = self.memory_limit > 0
+
+        # Start algorithm, finish if the root node is added to the tree with all terminals. With half sets any node
+        # with the full set is a solution
+        cnt = 0
         while True:
-            s, n = pop(self.queue)
-
-            if s == max_set and n == root_node:
+            try:
+                k = pop(self.queue)
+            except (IndexError, KeyError):
+                # Only possible if labels have been dropped, the best known tree is the result
+                if self.dropped == 0:
+                    raise
+                self.exhausted = True
+                return self.steiner.get_upper_bound()
+
+            s = k >> bits
+            if k == final_key or s == full_set:
                 break
 
-            n_cost = self.costs[n][s][0]
-            self.labels[n].append(s)
-            self.process_neighbors(n, s, n_cost)
+            # Check the time budget every now and then. If it is used up, the best known tree is the result
+            cnt += 1
+            if cnt & 1023 == 0:
+                if deadline.expired():
+                    return self.steiner.get_upper_bound()
+                if track_memory and self.memory_limit < self.memory():
+                    self.reduce_memory()
+                # Try to find a better tree, for a lower bound and as a result in case the time runs out
+                self.complete(k & node_mask, [s])
+
+            n = k & node_mask
+            n_cost = self.costs.cost(k)
+            # The check is done once per expansion instead of for every queued label, most labels are never expanded
+            if use_dominance and self.dominated(n, s, n_cost):
+                continue
+            if track_memory:
+                store = self.labels[n]
+                self.store_memory -= store.memory()
+                store.append(s)
+                self.store_memory += store.memory()
+            else:
+                self.labels[n].append(s)
+            if not half_sets or bin(s).count("1") <= half_size:
+                self.process_neighbors(n, s, n_cost)
             self.process_labels(n, s, n_cost)
 
         # Process result
         ret = Graph()
-        total = self.backtrack(self.root_node, self.max_set, ret)
+        total = self.backtrack(k & node_mask, s, ret)
 
         return ret, total
 
     def process_neighbors(self, n, n_set, n_cost):
-        nb = self.steiner.graph._adj
+        cst = self.costs
+        set_key = n_set << cst.node_bits
 
-        for other_node, dta in nb[n].items():
-            other_node_cost = self.costs[other_node][n_set]
+        for other_node, w in (self.steiner.graph.adj(n) if self.arcs is None else self.arcs[n]):
+            key = set_key | other_node
 
-            total = n_cost + dta['weight']
-            if total < other_node_cost[0]:
-                # Store costs. The second part of the tuple is backtracking info.
-                self.costs[other_node][n_set] = (total, n, False)
+            total = n_cost + w
+            # Store costs. The predecessor is backtracking info.
+            if cst.improve(key, total, n, False):
                 h = self.heuristic(other_node, n_set)
 
-                if total + h <= self.steiner.get_approximation().cost and not self.prune(other_node, n_set, total):
-                    self.push(self.queue, total + h, (n_set, other_node))
+                if total + h <= self.bound and not self.prune(other_node, n_set, total):
+                    self.push(self.queue, total + h, key)
 
     def process_labels(self, n, n_set, n_cost):
         # First localize for better performance
         lbl = self.labels[n].find_all
-        cst = self.costs[n]
+        cst = self.costs
+        bits = cst.node_bits
         heuristic = self.heuristic
         prune = self.prune
-        approx = self.steiner.get_approximation().cost
+        approx = self.bound
         q = self.queue
         push = self.push
+        max_set = self.max_set
+        half_sets = self.half_sets
+        half_size = self.half_size
+        n_size = bin(n_set).count("1") if half_sets else 0
+        n_large = n_size > half_size
+        root_bit = self.root_bit
+        # Connecting n to the root is the cheapest completion of a set without the root
+        root_dist = self.root_distances[n]
+        others = lbl(n_set)
+
+        # A set with the root and half of the terminals can only be completed to the full set
+        if n_set & self.root_bit and n_size == half_size:
+            others = [self.full_set ^ n_set] if (self.full_set ^ n_set) in self.labels[n] else []
 
         # Union result with all existing labels that are disjoint
-        for other_set in lbl(n_set):
+        for other_set in others:
             # Set union
             combined = n_set | other_set
 
-            o_cost = cst[other_set][0]
+            # Large sets grow by one small set at a time. Sets with the root stay small, except for the full set
+            if half_sets:
+                if n_large and bin(other_set).count("1") > half_size:
+                    continue
+                if combined & self.root_bit and combined != self.full_set \
+                        and bin(combined).count("1") > half_size:
+                    continue
+
+            o_cost = cst.cost((other_set << bits) | n)
             total = n_cost + o_cost
-            combined_cost = cst[combined]
 
-            if total < combined_cost[0]:
-                # The costs could be set inside the next conditional. This would maybe save some memory, but since
-                # this is a bound before executing the heuristic the next time round, the bound is preferable
+            # All terminals but the root, or all terminals: the labels are a tree once connected to the root
+            if combined & max_set == max_set and total + (0 if combined & root_bit else root_dist) < approx:
+                self.complete(n, [n_set, other_set])
+                approx = self.bound
+
+            combined_key = (combined << bits) | n
+
+            # The costs could be set inside the next conditional. This would maybe save some memory, but since
+            # this is a bound before executing the heuristic the next time round, the bound is preferable
+            if cst.improve(combined_key, total, other_set, True):
                 h = heuristic(n, combined)
-                cst[combined] = (total, other_set, True)
  
                 if total + h <= approx and not prune(n, n_set, total, other_set):
-                    push(q, total + h, (combined, n))
+                    push(q, total + h, combined_key)
+
+    def complete(self, n, sets):
+        """Builds a tree from the permanent labels for the sets at n. The missing terminals are added one by one, the
+        closest first, using a shortest path to any node of the tree. If the tree is cheaper than the bound, it becomes
+        the new bound"""
+        cst = self.costs
+        total = 0
+        ret = Graph()
+        ret.add_node(n)
+        for s in sets:
+            total += cst.cost(cst.key(n, s))
+            self.backtrack(n, s, ret)
+
+        # The distance from every missing terminal to the tree and the closest node of the tree
+        td = self.steiner.get_terminal_distances()
+        dist = {}
+        for t in self.steiner.terminals:
+            if not ret.has_node(t):
+                dist[t] = min((td.get(t, x), x) for x in ret.nodes)
+
+        weight = self.steiner.graph.weight
+        while dist:
+            t, (d, x) = min(dist.iteritems(), key=lambda e: e[1][0])
+            total += d
+            if total >= self.bound:
+                return
+
+            path = td.path(t, x)
+            for i in xrange(1, len(path)):
+                ret.add_edge(path[i - 1], path[i], weight=weight(path[i - 1], path[i]))
+
+            for t2 in [t2 for t2 in dist if ret.has_node(t2)]:
+                dist.pop(t2)
+            for (t2, (d2, _)) in dist.items():
+                for y in path:
+                    d3 = td.get(t2, y)
+                    if d3 < d2:
+                        d2 = d3
+                        dist[t2] = (d3, y)
+
+        # The labels may overlap
+        ret = minimum_spanning_tree(ret)
+        leafs = [x for (x, d) in ret.degree() if d == 1 and x not in self.steiner.terminals]
+        while leafs:
+            x = leafs.pop()
+            if ret.degree(x) == 1 and x not in self.steiner.terminals:
+                nb = next(iter(ret.neighbors(x)))
+                ret.remove_node(x)
+                leafs.append(nb)
+
+        total = sum(d for (_, _, d) in ret.edges(data='weight'))
+        if total < self.bound:
+            self.bound = total
+            self.steiner.add_solution(ret, total)
+            if self.arcs is not None:
+                self.filter_arcs()
+
+    def memory(self):
+        """Estimates the memory used by the labels in bytes. Entries in the queue need a position entry and boxed
+        integers, permanent labels the memory of the stores"""
+        return self.costs.memory() + 120 * self.queue_size(self.queue) + self.store_memory
+
+    def reduce_memory(self):
+        """Drops the half of the queued labels with the highest estimated total costs. The highest kept estimate
+        becomes the new bound, so the solution may not be optimal anymore"""
+        bits = self.costs.node_bits
+        node_mask = (1 << bits) - 1
+        bound, removed = self.queue_prune(self.queue, self.queue_size(self.queue) / 2)
+
+        if bound is not None and bound < self.bound:
+            self.bound = bound
+
+        # Labels that have been expanded before are needed for merges and backtracking
+        for k in removed:
+            if (k >> bits) not in self.labels[k & node_mask]:
+                self.costs.remove(k)
+
+        self.costs.shrink()
+        self.dropped += len(removed)
+
+    def dominated(self, n, set_id, c):
+        """Checks if n already has a permanent label for a superset that is not more expensive. That label can replace
+        the label in any tree, the additional terminals only add connections"""
+        cst = self.costs
+        bits = cst.node_bits
+        for other_set in self.labels[n].find_supersets(set_id):
+            if cst.cost((other_set << bits) | n) <= c:
+                return True
+
+        return False
 
     def heuristic(self, n, set_id):
         if self.heuristic_function is None:
             return 0
 
+        # Sets that contain the root are completed by a tree that connects n with the missing terminals
+        if set_id & self.root_bit:
+            set_id = self.full_set ^ set_id
+            return self.heuristic_function.calculate_unrooted(n, set_id) if set_id > 0 else 0
+
         # Invert set
         set_id = self.max_set ^ set_id
 
@@ -180,6 +439,10 @@ class Solver2k:
     def prune(self, n, set_id, c, set_id2=0):
         target_set = set_id | set_id2
 
+        # The bounds are for subtrees without the root
+        if target_set & self.root_bit:
+            return False
+
         try:
             bound = self.prune_bounds[target_set]
         # If no bound is known, try combining one, if the current set is a merge
@@ -199,6 +462,8 @@ class Solver2k:
     def prune_check_bound(self, set_id, n, bound, c):
         """Calculates the minimum distance between the cut of terminals in the set and not in the set"""
 
+        outside = self.order_mask ^ set_id
+
         # Find minimum distance between the terminals in the cut and outside the cut
         if set_id in self.prune_dist:
             dist = self.prune_dist[set_id]
@@ -207,16 +472,18 @@ class Solver2k:
             for cId, t in self.terminal_ids.items():
                 if (cId & set_id) > 0:
                     # Minimum dist from t to cut
-                    t2, d = next((t2, d) for (t2, d) in self.steiner.get_closest(t) if (self.terminal_set_ids[t2] & set_id) == 0)
-                    if d < dist[0]:
-                        dist = (d, t2)
+                    order = self.terminal_order(t)
+                    i = order.first(outside)
+                    if order.dists[i] < dist[0]:
+                        dist = (order.dists[i], order.nodes[i])
 
             self.prune_dist[set_id] = dist
 
         # Find the minimum distance between n and R \ set
-        n_t, n_d = next((x, y) for (x, y) in self.steiner.get_closest(n) if (self.terminal_set_ids[x] & set_id) == 0)
-        if n_d < dist[0]:
-            dist = (n_d, n_t)
+        order = self.terminal_order(n)
+        i = order.first(outside)
+        if order.dists[i] < dist[0]:
+            dist = (order.dists[i], order.nodes[i])
 
         # Check if we can lower the bound
         w = c + dist[0]
@@ -253,14 +520,14 @@ class Solver2k:
 
         # To minimize backtracking info stored, the entry contains either the previous node (share the same set)
         # or the previous to sets (share the same node). Or nothing if it is a leaf
-        entry = self.costs[n][s]
+        entry = self.costs.get(self.costs.key(n, s))
 
-        if entry[1] is None:
+        if entry[1] < 0:
             return 0
 
         if not entry[2]:
             n2 = entry[1]
-            w = self.steiner.graph[n][n2]['weight']
+            w = self.steiner.graph.weight(n, n2)
             ret.add_edge(n, n2, weight=w)
             return w + self.backtrack(n2, s, ret)
         else:
@@ -273,6 +540,15 @@ class Solver2k:
 
         return set(t for (s, t) in self.terminal_ids.items() if (s & set_id) > 0)
 
+    def terminal_order(self, n):
+        """Returns the terminals of the node in the order of distance, see TerminalOrder"""
+        order = self.orders[n]
+        if order is None:
+            order = to.TerminalOrder(self.steiner.get_closest(n), self.order_bits)
+            self.orders[n] = order
+
+        return order
+
     def to_list(self, set_id):
         """Converts a set identifier to the actual set of nodes"""
 
@@ -283,18 +559,3 @@ class Solver2k:
         #     return self.the_list_cache[set_id]
         return list(t for (s, t) in self.terminal_ids.items() if (s & set_id) > 0)
 
-
-class SolverCosts(dict):
-    """Derived dictionary that uses appropriate default values in case of missing keys"""
-
-    def __init__(self, terminal_id, maximum):
-        super(SolverCosts, self).__init__()
-        self.terminal_id = terminal_id
-        self.max_val = maximum
-
-    def __missing__(self, key):
-        if key == self.terminal_id:
-            return 0, None, False, 0
-
-        # Otherwise infinity
-        return self.max_val, None, False
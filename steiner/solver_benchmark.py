@@ -0,0 +1,71 @@
+import os
+import time
+import argparse
+import iparser as pp
+import config as cfg
+import deadline
+from solver.solver_2k import Solver2kConfig
+
+""" This script compares the solver with and without the half set restriction. The instances are solved without
+reductions, so the effect on the solver itself is measured"""
+
+parser = argparse.ArgumentParser(description="Compares solver settings")
+
+parser.add_argument('path', type=str, help="An instance or a directory of instances")
+
+parser.add_argument('--min', type=int, default=10, help="The minimum number of terminals")
+
+parser.add_argument('--max', type=int, default=20, help="The maximum number of terminals")
+
+parser.add_argument('--nodes', type=int, default=3000, help="The maximum number of nodes")
+
+parser.add_argument('--time', type=float, default=300, help="The limit in seconds per run")
+
+parser.add_argument('-a', action='store_false', help="Do not use dual ascent as a guiding heuristic")
+
+args = parser.parse_args()
+
+if os.path.isdir(args.path):
+    files = sorted(os.path.join(args.path, x) for x in os.listdir(args.path) if x.endswith(".gr"))
+else:
+    files = [args.path]
+
+print "{:<20} {:>5} {:>6} {:>10} {:>10} {:>10} {:>10} {:>10}".format(
+    "Instance", "Terms", "Nodes", "Cost", "Time", "Labels", "Time half", "Labels half")
+
+totals = [0, 0, 0, 0]
+for f in files:
+    steiner = pp.parse_pace_file(open(f, "r"))
+    if not args.min <= len(steiner.terminals) <= args.max or len(steiner.graph.nodes) > args.nodes \
+            or not steiner.graph.is_connected():
+        continue
+
+    steiner, _ = steiner.relabel()
+    # Shared by both runs, not part of the measurement
+    steiner.get_approximation()
+    steiner.get_terminal_distances()
+    results = []
+
+    for half_sets in [False, True]:
+        solver = cfg.solver(steiner, Solver2kConfig(use_da=args.a, half_sets=half_sets), 2000, 3)
+        deadline.set_limit(args.time)
+        start = time.time()
+        solution = solver.solve()
+        results.append((solution[1], time.time() - start, len(solver.costs), deadline.expired()))
+        deadline.set_limit(0)
+
+    if results[0][0] != results[1][0] and not results[0][3] and not results[1][3]:
+        print "*** Different costs {} and {}".format(results[0][0], results[1][0])
+
+    print "{:<20} {:>5} {:>6} {:>10} {:>10} {:>10} {:>10} {:>10}".format(
+        os.path.basename(f), len(steiner.terminals), len(steiner.graph.nodes), results[0][0],
+        "{:.2f}{}".format(results[0][1], "*" if results[0][3] else ""), results[0][2],
+        "{:.2f}{}".format(results[1][1], "*" if results[1][3] else ""), results[1][2])
+
+    for i in range(0, 2):
+        totals[2 * i] += results[i][1]
+        totals[2 * i + 1] += results[i][2]
+
+print "{:<20} {:>5} {:>6} {:>10} {:>10.2f} {:>10} {:>10.2f} {:>10}".format("Total", "", "", "", totals[0], totals[1],
+                                                                            totals[2], totals[3])
+print "* Time limit reached, the best known solution was used"
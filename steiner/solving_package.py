@@ -1,13 +1,15 @@
-from networkx import is_connected, nodes
+from networkx import is_connected, nodes, relabel_nodes
 import component_finder as cf
 import oparser.debug as o_dbg
 import oparser.pace as o_pace
 import reducer as red
 import config as cfg
+import sys
 import time
+import deadline
 from solver.solver_2k import Solver2kConfig
-
-from structures.steiner_graph import SteinerGraph
+from reduction.dual_ascent import DualAscent
+from steiner_approximation import SteinerApproximation
 
 """Packages the whole solver so it can be called from different runners"""
 
@@ -15,7 +17,8 @@ from structures.steiner_graph import SteinerGraph
 class SolvingConfig:
     def __init__(self, debug=False, solve=True, apply_reductions=True, verify=False, split=False, pace_only=False,
                  print_output=False, heavy_edges=False, heap_width=16, bucket_limit=5000, use_da=True, use_store=True,
-                 use_root=True, node_limit=2000, node_ratio_limit=3, reduction_limit=0):
+                 use_root=True, node_limit=2000, node_ratio_limit=3, reduction_limit=0, time_limit=0, memory_limit=0,
+                 half_sets=False, use_dominance=False, use_reduced_costs=True, workers=0):
         self.debug = debug
         self.solve = solve
         self.apply_reductions = apply_reductions
@@ -32,6 +35,18 @@ class SolvingConfig:
         self.node_limit = node_limit
         self.node_ratio_limit = node_ratio_limit
         self.reduction_limit = reduction_limit
+        # In seconds. Once used up, the best known upper bound is returned as the solution
+        self.time_limit = time_limit
+        # In MB for the labels of the solver. Once reached, the least promising labels are dropped
+        self.memory_limit = memory_limit
+        # Let the solver only move sets with up to half of the terminals
+        self.half_sets = half_sets
+        # Let the solver skip labels that are dominated by a label for a superset
+        self.use_dominance = use_dominance
+        # Let the solver skip edges that are too expensive according to the reduced costs of dual ascent
+        self.use_reduced_costs = use_reduced_costs
+        # Number of processes that calculate dual ascent bounds for the solver in advance
+        self.workers = workers
 
 
 def run(steiner, config):
@@ -42,9 +57,10 @@ def run(steiner, config):
     start_time = None
 
     if config.verify:
-        steiner_cp = SteinerGraph()
-        steiner_cp.graph = steiner.graph.copy()
-        steiner_cp.terminals = set(steiner.terminals)
+        steiner_cp = steiner.fork()
+
+    if config.time_limit > 0:
+        deadline.set_limit(config.time_limit)
 
     if config.debug:
         print "Loaded instance with {} vertices, {} edges, {} terminals".format(len(steiner.graph.nodes),
@@ -86,7 +102,7 @@ def _start_solve(steiner, config):
     # f.write("Nodes {}\n".format(len(steiner.graph.nodes)))
     # f.write("Edges {}\n".format(len(steiner.graph.edges)))
     # for u, v in steiner.graph.edges:
-    #     f.write("E {} {} {}\n".format(u, v, steiner.graph[u][v]['weight']))
+    #     f.write("E {} {} {}\n".format(u, v, steiner.graph.weight(u, v)))
     #
     # f.write("END\n\nSECTION Terminals\n")
     # f.write("Terminals {}\n".format(len(steiner.terminals)))
@@ -97,9 +113,17 @@ def _start_solve(steiner, config):
     # end write reduced graph
 
     if config.solve:
-        solution = cf.decompose(steiner, lambda x: _solve_instance(x, config),
+        # Number the remaining nodes densely, the solver uses lists indexed by node
+        reduced, labels = steiner.relabel()
+        mapping = {n: i for (i, n) in enumerate(labels)}
+        DualAscent.root = mapping.get(DualAscent.root)
+        _relabel_roots(SteinerApproximation.good_roots, mapping)
+        _relabel_roots(DualAscent.good_roots, mapping)
+
+        solution = cf.decompose(reduced, lambda x: _solve_instance(x, config),
                                 lambda x: _start_solve(x, config),
                                 config.debug, config.split)
+        solution = (relabel_nodes(solution[0], {n: labels[n] for n in solution[0].nodes}), solution[1])
 
         # This step is necessary as some removed edges and nodes have to be reintroduced in the solution
         if config.apply_reductions:
@@ -108,6 +132,13 @@ def _start_solve(steiner, config):
         return solution
 
 
+def _relabel_roots(roots, mapping):
+    """Translates the stored roots to the new node ids"""
+    new_roots = [mapping[r] for r in roots if r in mapping]
+    roots.clear()
+    roots.extend(new_roots)
+
+
 def _solve_instance(steiner, config):
     if config.debug:
         print "Solving instance with {} vertices, {} edges, {} terminals".format(len(steiner.graph.nodes),
@@ -115,13 +146,33 @@ def _solve_instance(steiner, config):
                                                                                  len(steiner.terminals))
 
     # Reset lengths as they may not reflect reality after the reductions
-    steiner._lengths = {}
+    steiner._reset_lengths()
+
+    # Out of time, use the best known upper bound
+    if deadline.expired() and len(steiner.terminals) > 1:
+        return steiner.get_upper_bound()
 
     # Solve
     solver = cfg.solver(steiner, Solver2kConfig(config.heap_width, config.bucket_limit, config.use_root,
-                                                config.use_store, config.use_da),
+                                                config.use_store, config.use_da, memory_limit=config.memory_limit,
+                                                half_sets=config.half_sets, use_dominance=config.use_dominance,
+                                                use_reduced_costs=config.use_reduced_costs, workers=config.workers),
                         config.node_limit, config.node_ratio_limit)
-    solution = solver.solve()
+    try:
+        solution = solver.solve()
+    finally:
+        # Stops the worker processes, if any
+        solver.heuristic_function.close()
+
+    if config.debug:
+        for line in solver.heuristic_function.stats():
+            print line
+
+    # The output must only contain the solution, report on stderr
+    if solver.dropped > 0:
+        sys.stderr.write("Memory limit reached: dropped {} labels above {}, {}\n".format(
+            solver.dropped, solver.bound,
+            "used the best known tree" if solver.exhausted else "the solution may not be optimal"))
 
     # Quick validity checks
     if config.debug and config.split:
@@ -147,7 +198,7 @@ def _verify(steiner, solution):
 
     for (u, v, d) in solution[0].edges(data='weight'):
         total_sum = total_sum + d
-        if not steiner.graph.has_edge(u, v) or steiner.graph[u][v]['weight'] != d:
+        if not steiner.graph.has_edge(u, v) or steiner.graph.weight(u, v) != d:
             print "*** Unknown edge {}-{} in solution after unreduce".format(u, v)
             correct = False
 
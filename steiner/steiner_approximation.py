@@ -4,6 +4,7 @@ from collections import defaultdict, deque
 from itertools import chain
 from networkx import Graph, ancestors, dijkstra_path, minimum_spanning_edges, dfs_tree, minimum_spanning_tree, \
     is_connected
+import deadline
 
 
 # TODO: Optimize the whole thing
@@ -22,7 +23,7 @@ class VoronoiPartition:
 
         queue = []
         visited = set()
-        nb = source._adj
+        adj = source.adj
         # TODO: Use scanned instead of visited?
         # Find voronoi regions. Initialize with tree nodes as voronoi centers
         for n in target.nodes:
@@ -39,9 +40,9 @@ class VoronoiPartition:
                 self.regions[el[2]][el[1]] = (el[0], el[3])
                 self._closest[el[1]] = el[2]
 
-                for n, dta in nb[el[1]].items():
+                for n, w in adj(el[1]):
                     if n not in visited:
-                        cost = el[0] + dta['weight']
+                        cost = el[0] + w
                         push(queue, [cost, n, el[2], el[1]])
 
     def reset(self):
@@ -58,7 +59,7 @@ class VoronoiPartition:
         repair_nodes = set()
         visited_repair = set()
         queue = []
-        nbs = self.source._adj
+        adj = self.source.adj
         pop = heappop
         push = heappush
 
@@ -68,10 +69,10 @@ class VoronoiPartition:
 
         # Initialize dijkstra s.t. the boundary nodes are added with the distance to the adjacent center
         for rep in repair_nodes:
-            for nb, dta in nbs[rep].items():
+            for nb, w in adj(rep):
                 c_closest = self._closest[nb]
                 if c_closest not in intermediaries:
-                    cost = self.regions[c_closest][nb][0] + dta['weight']
+                    cost = self.regions[c_closest][nb][0] + w
                     push(queue, [cost, rep, c_closest, nb])
 
         # Run dijkstra, limit to dangling nodes
@@ -82,9 +83,9 @@ class VoronoiPartition:
                 self._tmp_closest[el[1]] = el[2]
                 self._tmp_regions.setdefault(el[2], {})[el[1]] = (el[0], el[3])
 
-                for nb, dta in nbs[el[1]].items():
+                for nb, w in adj(el[1]):
                     if nb not in visited_repair and nb in repair_nodes:
-                        cost = el[0] + dta['weight']
+                        cost = el[0] + w
                         push(queue, [cost, nb, el[2], el[1]])
 
     def extract_path(self, n):
@@ -99,7 +100,7 @@ class VoronoiPartition:
                 vor = self.regions[t]
 
             prev = vor[n][1]
-            path.append((n, prev, self.source[n][prev]['weight']))
+            path.append((n, prev, self.source.weight(n, prev)))
             n = prev
 
         # returns path and endpoint
@@ -151,7 +152,12 @@ class SteinerApproximation:
             seed = el
             target_roots.add(el)
 
-        results = [(self.calculate2(steiner, start_node), start_node) for start_node in target_roots]
+        results = []
+        for start_node in target_roots:
+            # Out of time, one tree is enough
+            if results and deadline.expired():
+                break
+            results.append((self.calculate2(steiner, start_node), start_node))
         results.sort(key=lambda x: x[0][1])
         for i in reversed(range(0, len(results))):
             SteinerApproximation.good_roots.append(results[i][1])
@@ -194,7 +200,7 @@ class SteinerApproximation:
     def optimize(self):
         prev = 0
 
-        while prev != self.cost:
+        while prev != self.cost and not deadline.expired():
             prev = self.cost
             self.keyvertex_deletion(self.steiner)
             self.path_exchange(self.steiner, False)
@@ -218,6 +224,9 @@ class SteinerApproximation:
         queue = [x for x in steiner.terminals if x != start_node]
         tree.add_node(start_node)
 
+        # The graph does not change, convert it once
+        dg = steiner.graph.to_directed()
+
         while queue:
             # Find terminal with minimal distance to tree
             t, n = min(((t, n) for t in queue for n in tree.nodes), key=lambda el: steiner.get_lengths(el[0], el[1]))
@@ -226,13 +235,13 @@ class SteinerApproximation:
             queue.remove(t)
 
             # Find shortest path between tree and terminal
-            path = dijkstra_path(steiner.graph, t, n)
+            path = dijkstra_path(dg, t, n)
 
             # Now add the path to the tree
             c_node = path.pop()
             while path:
                 c_next = path.pop()
-                tree.add_edge(c_node, c_next, weight=steiner.graph[c_node][c_next]['weight'])
+                tree.add_edge(c_node, c_next, weight=steiner.graph.weight(c_node, c_next))
                 c_node = c_next
 
         # Improve solution by creating an MST and deleting non-terminal leafs
@@ -255,7 +264,7 @@ class SteinerApproximation:
     def calculate2(steiner, start_node):
         tree = Graph()
         tree.add_node(start_node)
-        nb = steiner.graph._adj
+        adj = steiner.graph.adj
 
         scanned = {start_node: (0, 0, 0)}
         p = {start_node: None}
@@ -265,10 +274,10 @@ class SteinerApproximation:
         def _expand_node(expand_n, base_cost, randomizer):
             """Expands a single node. Sets cost, previous and queue status for neighboring nodes"""
 
-            for next_n, props in nb[expand_n].items():
+            for next_n, w in adj(expand_n):
                 randomizer -= 1
-                total_cost = props['weight'] + base_cost
-                e_cost = (total_cost, props['weight'], randomizer)
+                total_cost = w + base_cost
+                e_cost = (total_cost, w, randomizer)
 
                 # Check for tree membership as this signifies a loop back to the tree
                 if next_n not in scanned or e_cost < scanned[next_n] and not tree.has_node(next_n):
@@ -297,7 +306,7 @@ class SteinerApproximation:
                 # add path to tree
                 while path:
                     c_next = path.pop()
-                    tree.add_edge(c_node, c_next, weight=nb[c_node][c_next]['weight'])
+                    tree.add_edge(c_node, c_next, weight=steiner.graph.weight(c_node, c_next))
                     _expand_node(c_next, 0, 0)
                     c_node = c_next
             else:
@@ -328,11 +337,11 @@ class SteinerApproximation:
                     g = self.tree.copy()
 
                     # Add first edge
-                    g.add_edge(n, nb[0], weight=steiner.graph[n][nb[0]]['weight'])
+                    g.add_edge(n, nb[0], weight=steiner.graph.weight(n, nb[0]))
 
                     # Try to insert edges and improve result
                     for i in xrange(1, len(nb)):
-                        c = steiner.graph[n][nb[i]]['weight']
+                        c = steiner.graph.weight(n, nb[i])
                         p = list(dijkstra_path(g, n, nb[i]))
 
                         # Find most expensive edge in path
@@ -416,10 +425,10 @@ class SteinerApproximation:
                 # Find intermediary nodes and cost of the current key path
                 intermediaries = set()
                 idx = len(c_path) - 1
-                c_path_cost = steiner.graph[node][parent]['weight']
+                c_path_cost = steiner.graph.weight(node, parent)
                 while c_path[idx] != last:
                     intermediaries.add(c_path[idx])
-                    c_path_cost += steiner.graph[c_path[idx]][c_path[idx - 1]]['weight']
+                    c_path_cost += steiner.graph.weight(c_path[idx], c_path[idx - 1])
                     idx -= 1
 
                 # Do not try to remove pinned elements
@@ -704,7 +713,7 @@ class SteinerApproximation:
 
                         child_edges.append((c_node, node))
 
-                    original_cost = sum(steiner.graph[x][y]['weight'] for (x, y) in child_edges)
+                    original_cost = sum(steiner.graph.weight(x, y) for (x, y) in child_edges)
 
                     # Replace
                     if original_cost > mst_cost:
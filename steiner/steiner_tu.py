@@ -1,9 +1,20 @@
+import os
 import sys
 
 import iparser as pp
 import solving_package as sp
+import deadline
 
 """ This script is used for PACE. It reads the instance from STDIN and has no extra output except the solution"""
 
-steiner = pp.parse_pace_file(sys.stdin)
-sp.run(steiner, sp.SolvingConfig())
+# On SIGTERM the best known solution is printed instead of nothing. An additional budget in seconds can be set
+deadline.handle_sigterm()
+time_limit = float(os.environ.get("STEINER_TIME_LIMIT", 0))
+memory_limit = int(os.environ.get("STEINER_MEMORY_LIMIT", 0))
+
+# Parsed instances can be cached between runs by setting a cache directory
+if os.environ.get("STEINER_CACHE"):
+    steiner = pp.parse_pace_file_cached(sys.stdin, os.environ["STEINER_CACHE"])
+else:
+    steiner = pp.parse_pace_file(sys.stdin)
+sp.run(steiner, sp.SolvingConfig(print_output=True, time_limit=time_limit, memory_limit=memory_limit))
@@ -0,0 +1,434 @@
+from array import array
+from heapq import heappush, heappop
+from networkx import DiGraph
+
+"""A compact undirected graph stored in flat integer arrays. Every node owns a segment of the neighbor and weight
+arrays (compressed sparse row layout). Segments have some slack so edges can be added in place, deleting an edge swaps
+it with the last live entry of the segment. A segment that runs out of space is moved to the end of the arrays.
+Node ids are used as indices, therefore they should be small non-negative integers as in the PACE format."""
+
+
+class ArrayGraph:
+    """Undirected weighted graph that supports deletion and contraction. Offers the subset of the networkx interface
+    used in this project, plus adj(n) that returns the neighbors together with the weights"""
+
+    def __init__(self, node_count=0):
+        # Per node: start of the segment, number of live entries and size of the segment
+        self._start = array('l', [0]) * node_count
+        self._deg = array('l', [0]) * node_count
+        self._cap = array('l', [0]) * node_count
+        # Per (directed) edge: neighbor and weight
+        self._tgt = array('i')
+        self._wt = array('l')
+        self._nodes = set()
+        self._edge_count = 0
+        # Number of entries in the edge arrays that are not part of a segment anymore
+        self._garbage = 0
+        # True if the node arrays may be used by another graph, see fork
+        self._shared = False
+        # If the edge arrays are shared with a fork: the nodes whose segments belong to this graph alone, else None
+        self._owned = None
+
+    @staticmethod
+    def from_edges(us, vs, ws, node_count=None):
+        """Builds a graph in one go from parallel sequences of edge end points and weights. Duplicate edges keep
+        the cheaper weight"""
+        if node_count is None:
+            node_count = max(max(us), max(vs)) + 1 if len(us) > 0 else 0
+
+        g = ArrayGraph(node_count)
+        deg = g._deg
+        cap = g._cap
+        start = g._start
+
+        for u in us:
+            cap[u] += 1
+        for v in vs:
+            cap[v] += 1
+
+        c_start = 0
+        for n in xrange(0, node_count):
+            start[n] = c_start
+            c_start += cap[n]
+
+        g._tgt = array('i', [0]) * c_start
+        g._wt = array('l', [0]) * c_start
+        tgt = g._tgt
+        wt = g._wt
+
+        # Position of every edge in the segment of its smaller end point, indexed by the end points
+        known = {}
+        for i in xrange(0, len(us)):
+            u, v, w = us[i], vs[i], ws[i]
+            if u == v:
+                continue
+            if u > v:
+                u, v = v, u
+
+            # Duplicates are rare, but possible in the input. Keep the first entry and update its weight
+            key = u * node_count + v
+            idx = known.get(key)
+            if idx is not None:
+                if w < wt[idx]:
+                    g.set_weight(u, v, w)
+                continue
+
+            p = start[u] + deg[u]
+            known[key] = p
+            tgt[p] = v
+            wt[p] = w
+            deg[u] += 1
+            p = start[v] + deg[v]
+            tgt[p] = u
+            wt[p] = w
+            deg[v] += 1
+            g._edge_count += 1
+
+        g._nodes = set(us)
+        g._nodes.update(vs)
+        g._garbage = c_start - 2 * g._edge_count
+
+        return g
+
+    @property
+    def nodes(self):
+        """The set of nodes. Must not be changed directly"""
+        return self._nodes
+
+    @property
+    def edges(self):
+        return _EdgeView(self)
+
+    def __len__(self):
+        return len(self._nodes)
+
+    def _ensure(self, n):
+        """Makes sure the node arrays are large enough to hold node n"""
+        missing = n + 1 - len(self._start)
+        if missing > 0:
+            # Grow geometrically, node ids are usually added in ascending order
+            missing = max(missing, len(self._start) / 2)
+            zeros = array('l', [0]) * missing
+            self._start.extend(zeros)
+            self._deg.extend(zeros)
+            self._cap.extend(zeros)
+
+    def _find(self, u, v):
+        """Returns the index of v in the segment of u or -1"""
+        s = self._start[u]
+        d = self._deg[u]
+        if d == 0:
+            return -1
+
+        try:
+            return s + self._tgt[s:s + d].index(v)
+        except ValueError:
+            return -1
+
+    def _move(self, u, new_cap):
+        """Moves the segment of u to the end of the edge arrays and resizes it"""
+        s = self._start[u]
+        d = self._deg[u]
+        tgt = self._tgt
+        wt = self._wt
+        new_s = len(tgt)
+        tgt.extend(tgt[s:s + d])
+        wt.extend(wt[s:s + d])
+        tgt.extend(array('i', [0]) * (new_cap - d))
+        wt.extend(array('l', [0]) * (new_cap - d))
+        self._garbage += self._cap[u] + new_cap - d
+        self._start[u] = new_s
+        self._cap[u] = new_cap
+
+        if self._owned is not None:
+            self._owned.add(u)
+
+    def _own(self, u):
+        """Makes sure the segment of u can be changed, i.e. it is not used by a fork"""
+        owned = self._owned
+        if owned is not None and u not in owned:
+            self._move(u, self._cap[u])
+
+    def _append(self, u, v, w):
+        """Appends v to the segment of u. Moves the segment if it is full"""
+        d = self._deg[u]
+
+        if d == self._cap[u]:
+            self._move(u, max(4, 2 * d))
+        else:
+            self._own(u)
+
+        s = self._start[u]
+        self._tgt[s + d] = v
+        self._wt[s + d] = w
+        self._deg[u] = d + 1
+        self._garbage -= 1
+
+    def _delete(self, u, idx):
+        """Removes the entry at idx from the segment of u"""
+        last = self._start[u] + self._deg[u] - 1
+        self._tgt[idx] = self._tgt[last]
+        self._wt[idx] = self._wt[last]
+        self._deg[u] -= 1
+        self._garbage += 1
+
+    def has_node(self, n):
+        return n in self._nodes
+
+    def has_edge(self, u, v):
+        if u not in self._nodes or v not in self._nodes:
+            return False
+
+        if self._deg[u] > self._deg[v]:
+            u, v = v, u
+
+        return self._find(u, v) >= 0
+
+    def weight(self, u, v):
+        """Returns the weight of the edge. Raises a KeyError if the edge does not exist"""
+        if u in self._nodes:
+            idx = self._find(u, v)
+            if idx >= 0:
+                return self._wt[idx]
+
+        raise KeyError((u, v))
+
+    def set_weight(self, u, v, w):
+        if self._shared:
+            self._unshare()
+        self._own(u)
+        self._own(v)
+        idx1 = self._find(u, v)
+        idx2 = self._find(v, u)
+        if idx1 < 0 or idx2 < 0:
+            raise KeyError((u, v))
+
+        self._wt[idx1] = w
+        self._wt[idx2] = w
+
+    def max_weight(self):
+        """An upper bound for the weights, the unused entries contain weights of removed edges"""
+        return max(self._wt) if len(self._wt) > 0 else 0
+
+    def degree(self, n):
+        return self._deg[n]
+
+    def adj(self, n):
+        """Returns a list of (neighbor, weight) tuples"""
+        s = self._start[n]
+        e = s + self._deg[n]
+        return zip(self._tgt[s:e], self._wt[s:e])
+
+    def neighbors(self, n):
+        s = self._start[n]
+        return iter(self._tgt[s:s + self._deg[n]])
+
+    def add_node(self, n):
+        if self._shared:
+            self._unshare()
+        self._ensure(n)
+        self._nodes.add(n)
+
+    def add_edge(self, u, v, weight):
+        """Adds an edge. If the edge already exists, the weight is replaced"""
+        if self._shared:
+            self._unshare()
+        if u in self._nodes and v in self._nodes:
+            idx = self._find(u, v)
+            if idx >= 0:
+                self.set_weight(u, v, weight)
+                return
+
+        self.add_node(u)
+        self.add_node(v)
+        self._append(u, v, weight)
+        self._append(v, u, weight)
+        self._edge_count += 1
+
+        if self._garbage > 2 * len(self._tgt) / 3 and len(self._tgt) > 1024:
+            self.compact()
+
+    def remove_edge(self, u, v):
+        if self._shared:
+            self._unshare()
+        idx1 = self._find(u, v) if u in self._nodes else -1
+        idx2 = self._find(v, u) if v in self._nodes else -1
+        if idx1 < 0 or idx2 < 0:
+            raise KeyError((u, v))
+
+        # The positions change if the segments are moved
+        if self._owned is not None:
+            self._own(u)
+            self._own(v)
+            idx1 = self._find(u, v)
+            idx2 = self._find(v, u)
+
+        self._delete(u, idx1)
+        self._delete(v, idx2)
+        self._edge_count -= 1
+
+    def remove_node(self, n):
+        if n not in self._nodes:
+            raise KeyError(n)
+        if self._shared:
+            self._unshare()
+
+        for v in self.neighbors(n):
+            self._own(v)
+            self._delete(v, self._find(v, n))
+
+        self._edge_count -= self._deg[n]
+        self._garbage += self._deg[n]
+        self._deg[n] = 0
+        self._nodes.remove(n)
+
+    def compact(self):
+        """Removes unused space from the edge arrays"""
+        if self._shared:
+            self._unshare()
+        tgt = array('i')
+        wt = array('l')
+        start = self._start
+        deg = self._deg
+        cap = self._cap
+
+        for n in xrange(0, len(start)):
+            s = start[n]
+            d = deg[n]
+            start[n] = len(tgt)
+            cap[n] = d
+            if d > 0:
+                tgt.extend(self._tgt[s:s + d])
+                wt.extend(self._wt[s:s + d])
+
+        self._tgt = tgt
+        self._wt = wt
+        self._garbage = 0
+        self._owned = None
+
+    def fork(self):
+        """Creates a copy in constant time, both graphs use the same arrays. The node arrays are copied on the first
+        change. A segment of the edge arrays is moved to the end of the arrays before it is changed, the arrays only
+        grow while they are shared. Changing a fork costs the node arrays plus the segments of the touched nodes"""
+        g = ArrayGraph()
+        g._start = self._start
+        g._deg = self._deg
+        g._cap = self._cap
+        g._tgt = self._tgt
+        g._wt = self._wt
+        g._nodes = self._nodes
+        g._edge_count = self._edge_count
+        g._garbage = self._garbage
+        g._shared = True
+        self._shared = True
+        g._owned = set()
+        self._owned = set()
+
+        return g
+
+    def _unshare(self):
+        """Copies the node arrays of a fork before they are changed"""
+        self._start = array('l', self._start)
+        self._deg = array('l', self._deg)
+        self._cap = array('l', self._cap)
+        self._nodes = set(self._nodes)
+        self._shared = False
+
+    def copy(self):
+        g = ArrayGraph()
+        g._start = array('l', self._start)
+        g._deg = array('l', self._deg)
+        g._cap = array('l', self._cap)
+        g._tgt = array('i', self._tgt)
+        g._wt = array('l', self._wt)
+        g._nodes = set(self._nodes)
+        g._edge_count = self._edge_count
+        g._garbage = self._garbage
+
+        return g
+
+    def to_directed(self):
+        """Creates a networkx digraph with arcs in both directions"""
+        dg = DiGraph()
+        dg.add_nodes_from(self._nodes)
+        for n in self._nodes:
+            for n2, w in self.adj(n):
+                dg.add_edge(n, n2, weight=w)
+
+        return dg
+
+    def dijkstra(self, source, cut_off=None):
+        """Calculates the distances from source to all reachable nodes. Returns a dictionary"""
+        dist = {source: 0}
+        visited = set()
+        queue = [(0, source)]
+        adj = self.adj
+
+        while queue:
+            d, n = heappop(queue)
+
+            if n in visited:
+                continue
+            visited.add(n)
+
+            for n2, w in adj(n):
+                d2 = d + w
+                if (cut_off is None or d2 <= cut_off) and (n2 not in dist or d2 < dist[n2]):
+                    dist[n2] = d2
+                    heappush(queue, (d2, n2))
+
+        return dist
+
+    def connected_components(self):
+        """Generates the sets of nodes for every connected component"""
+        seen = set()
+
+        for n in self._nodes:
+            if n not in seen:
+                component = {n}
+                queue = [n]
+
+                while queue:
+                    c_n = queue.pop()
+                    for n2 in self.neighbors(c_n):
+                        if n2 not in component:
+                            component.add(n2)
+                            queue.append(n2)
+
+                seen.update(component)
+                yield component
+
+    def is_connected(self):
+        if len(self._nodes) == 0:
+            return False
+
+        return len(next(self.connected_components())) == len(self._nodes)
+
+
+class _EdgeView:
+    """Mimics the networkx edge view. Iterating yields each edge once"""
+
+    def __init__(self, g):
+        self._g = g
+
+    def __len__(self):
+        return self._g._edge_count
+
+    def __iter__(self):
+        return (e[0:2] for e in self(data='weight'))
+
+    def __call__(self, data=None):
+        if data is None:
+            return iter(self)
+
+        return self._iter_weighted()
+
+    def _iter_weighted(self):
+        g = self._g
+
+        # Work on a snapshot, callers often remove edges during iteration
+        for u in list(g.nodes):
+            if u in g.nodes:
+                for v, w in g.adj(u):
+                    if u < v:
+                        yield u, v, w
@@ -0,0 +1,94 @@
+"""A cache for arrays of bounds, limited by the memory used"""
+
+
+class BoundCache:
+    """Maps keys to arrays, or other values with a given size. If the values exceed the memory budget (in bytes),
+    entries are evicted with the CLOCK algorithm: the keys are kept in a ring, a hand moves over the ring and evicts the
+    first key that has not been used since the hand passed it last. New keys are inserted behind the hand"""
+
+    # Estimate for the dictionary entries and the array object
+    entry_overhead = 128
+
+    def __init__(self, budget):
+        self.budget = budget
+        self.used = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        # Per key the array, whether it was used since the hand passed it and its size
+        self._entries = {}
+        self._ring = []
+        self._hand = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, key):
+        return key in self._entries
+
+    def get(self, key):
+        """Returns the array for the key, None if it is not in the cache"""
+        try:
+            entry = self._entries[key]
+        except KeyError:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        entry[1] = True
+        return entry[0]
+
+    def peek(self, key):
+        """Same as get, but does not count as a hit or miss"""
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+
+        entry[1] = True
+        return entry[0]
+
+    def put(self, key, values, size=None):
+        if size is None:
+            size = len(values) * values.itemsize + self.entry_overhead
+
+        # A known key is replaced in place and keeps its position in the ring
+        entry = self._entries.get(key)
+        if entry is not None:
+            self.used -= entry[2]
+            entry[0] = values
+            entry[2] = size
+
+        while len(self._ring) > (0 if entry is None else 1) and self.used + size > self.budget:
+            self._evict(key)
+
+        if entry is None:
+            self._entries[key] = [values, False, size]
+            self._ring.insert(self._hand, key)
+            self._hand += 1
+        self.used += size
+
+    def stats(self):
+        return "{} entries, {} MB, {} hits, {} misses, {} evictions".format(
+            len(self._entries), self.used / 1024 / 1024, self.hits, self.misses, self.evictions)
+
+    def clear(self):
+        self._entries.clear()
+        self._ring = []
+        self._hand = 0
+        self.used = 0
+
+    def _evict(self, keep):
+        """Evicts one entry, other than the key keep"""
+        ring = self._ring
+        while True:
+            if self._hand >= len(ring):
+                self._hand = 0
+
+            entry = self._entries[ring[self._hand]]
+            if entry[1] or ring[self._hand] == keep:
+                entry[1] = False
+                self._hand += 1
+            else:
+                self.used -= self._entries.pop(ring.pop(self._hand))[2]
+                self.evictions += 1
+                return
@@ -14,9 +14,10 @@ def enqueue(queue, priority, key):
     ls, e, q_min = queue
 
     # If existing and smaller, move item up
-    if key in e:
-        if priority < e[key]:
-            ls[e[key]].remove(key)
+    current = e.get(key)
+    if current is not None:
+        if priority < current:
+            ls[current].remove(key)
             ls[priority].add(key)
             e[key] = priority
     # Add to bucket
@@ -48,4 +49,30 @@ def dequeue(queue):
     val = ls[c_min].pop()
     e.pop(val)
 
-    return val
\ No newline at end of file
+    return val
+
+def size(queue):
+    return len(queue[1])
+
+
+def prune(queue, keep):
+    """Keeps the keep entries with the lowest priority, plus the ones tied with the last of them. Returns the highest
+    kept priority and the removed keys"""
+    ls, e, q_min = queue
+    bound = None
+    removed = []
+    cnt = 0
+
+    for p in xrange(min(q_min[0], len(ls)), len(ls)):
+        if ls[p]:
+            if cnt < keep:
+                cnt += len(ls[p])
+                bound = p
+            else:
+                removed.extend(ls[p])
+                ls[p] = set()
+
+    for k in removed:
+        del e[k]
+
+    return bound, removed
@@ -0,0 +1,69 @@
+from itertools import chain
+from sys import maxint
+
+"""Stores the terminals sorted by distance to a node. Usually only the closest few terminals are needed"""
+
+
+class ClosestTerminals:
+    """Sorted list of (terminal, distance) tuples for one node. Only the closest terminals are known in the beginning,
+    the remaining ones are taken from the terminal distance matrix when they are accessed. In case the graph changed in
+    between, the two parts may reflect different states and are only sorted individually. Terminals that cannot be
+    reached are not contained"""
+
+    def __init__(self, n, entries, full, distances):
+        self.n = n
+        self._entries = entries
+        self._full = full
+        # Function that returns the terminal distance matrix
+        self._distances = distances
+
+    def __iter__(self):
+        if self._full:
+            return iter(self._entries)
+
+        return chain(self._entries, self._extend(len(self._entries)))
+
+    def __getitem__(self, i):
+        if not self._full and (i < 0 or i >= len(self._entries)):
+            for _ in self._extend(len(self._entries)):
+                pass
+
+        return self._entries[i]
+
+    def get(self, i):
+        """Returns the entry at position i, (None, maxint) if fewer terminals can be reached"""
+        if not self._full and i >= len(self._entries):
+            for _ in self._extend(len(self._entries)):
+                pass
+
+        return self._entries[i] if i < len(self._entries) else (None, maxint)
+
+    def __len__(self):
+        if not self._full:
+            for _ in self._extend(len(self._entries)):
+                pass
+
+        return len(self._entries)
+
+    def _extend(self, start):
+        """Adds the remaining terminals and yields the entries from start on"""
+        if not self._full:
+            known = {t for (t, _) in self._entries}
+            self._entries.extend(x for x in self._distances().closest(self.n) if x[0] not in known and x[1] < maxint)
+            self._full = True
+
+        for i in xrange(start, len(self._entries)):
+            yield self._entries[i]
+
+    def move(self, t_source, t_target, d):
+        """Removes t_source. In case t_target becomes a new terminal, d is its distance"""
+        entries = [x for x in self._entries if x[0] != t_source]
+
+        # Only known entries may be stored, otherwise the distance matrix provides t_target
+        if d is not None and d < maxint and (self._full or (len(entries) > 0 and d <= entries[-1][1])):
+            idx = 0
+            while idx < len(entries) and entries[idx][1] <= d:
+                idx += 1
+            entries.insert(idx, (t_target, d))
+
+        self._entries = entries
@@ -1,66 +1,68 @@
+from array import array
 
 """Implements a d-heap for priority queues.
 A d-heap is a heap with d children. A binary heap is a 2-heap.
 Higher d values allow for faster inserts, but retrieval (delete-min) takes longer.
-See https://www.cs.princeton.edu/~wayne/kleinberg-tardos/pdf/BinomialHeaps.pdf"""
+See https://www.cs.princeton.edu/~wayne/kleinberg-tardos/pdf/BinomialHeaps.pdf
 
+The keys are integers. Priorities and keys are stored in two parallel arrays, the position of a key is kept in a
+dictionary. Keys that do not fit into a C long (wide) are stored in a list instead"""
 
-def create_queue(d):
-    return [], {}, d
 
+def create_queue(d, wide=False):
+    return array('l'), [] if wide else array('l'), {}, d
 
-def _bubble_up(ls, e, d, idx):
-    n_val = ls[idx]
 
+def _bubble_up(prio, keys, e, d, idx, n_prio, n_key):
     # Bubble value up the tree
     while idx > 0:
         n_idx = (idx - 1) / d
 
         # if current node is bigger, swap
-        if ls[n_idx][0] > n_val[0]:
-            ls[idx] = ls[n_idx]
-            e[ls[n_idx][1]] = idx
+        if prio[n_idx] > n_prio:
+            prio[idx] = prio[n_idx]
+            keys[idx] = keys[n_idx]
+            e[keys[n_idx]] = idx
             idx = n_idx
             continue
         break
 
     # This may reduce the number of set operations, set values at the end
-    ls[idx] = n_val
-    e[n_val[1]] = idx
+    prio[idx] = n_prio
+    keys[idx] = n_key
+    e[n_key] = idx
 
 
 def enqueue(queue, priority, key):
-    ls, e, d = queue
+    prio, keys, e, d = queue
 
     # Check if value already exists
-    if key in e:
-        idx = e[key]
-        if ls[idx][0] <= priority:
+    idx = e.get(key)
+    if idx is not None:
+        if prio[idx] <= priority:
             return
-        else:
-            ls[idx][0] = priority
     else:
-        idx = len(ls)
-        ls.append([priority, key])
+        idx = len(prio)
+        prio.append(priority)
+        keys.append(key)
 
-    _bubble_up(ls, e, d, idx)
+    _bubble_up(prio, keys, e, d, idx, priority, key)
 
 
 def dequeue(queue):
-    ls, e, d = queue
+    prio, keys, e, d = queue
 
     # Swap last und first value. Remove last value
-    val = ls[0]
-    n_val = ls.pop()
-    e.pop(val[1])
-    if not ls:
-        return val[1]
-
-    ls[0] = n_val
+    val = keys[0]
+    n_prio = prio.pop()
+    n_key = keys.pop()
+    del e[val]
+    if not prio:
+        return val
 
     # Push element down to a leaf
     idx = 0
-    end = len(ls)
+    end = len(prio)
     child = 1
 
     # Iterate until leaf is found
@@ -71,20 +73,48 @@ def dequeue(queue):
 
         # Find smallest child
         while child < stop:
-            if ls[child][0] < ls[c_idx][0]:
+            if prio[child] < prio[c_idx]:
                 c_idx = child
             child += 1
 
         # Move minimum item up one level
-        ls[idx] = ls[c_idx]
-        e[ls[c_idx][1]] = idx
+        prio[idx] = prio[c_idx]
+        keys[idx] = keys[c_idx]
+        e[keys[c_idx]] = idx
         idx = c_idx
         child = d * idx + 1
 
     # Let element bubble up. As the element was the last it is usually large
     # on average putting it at a leaf and bubbling up needs fewer comparisons
-    ls[idx] = n_val
-    e[n_val[1]] = idx
-    _bubble_up(ls, e, d, idx)
+    _bubble_up(prio, keys, e, d, idx, n_prio, n_key)
+
+    return val
+
+
+def size(queue):
+    return len(queue[0])
+
+
+def prune(queue, keep):
+    """Keeps the keep entries with the lowest priority, plus the ones tied with the last of them. Returns the highest
+    kept priority and the removed keys"""
+    prio, keys, e, d = queue
+    entries = sorted(zip(prio, keys))
+    if keep >= len(entries):
+        return entries[-1][0] if entries else None, []
+
+    bound = entries[keep - 1][0] if keep > 0 else None
+    cut = keep
+    while bound is not None and cut < len(entries) and entries[cut][0] <= bound:
+        cut += 1
+
+    # A sorted array is a valid heap
+    del prio[:]
+    del keys[:]
+    e.clear()
+    for i in xrange(0, cut):
+        prio.append(entries[i][0])
+        keys.append(entries[i][1])
+        e[entries[i][1]] = i
 
-    return val[1]
+    return bound, [k for (_, k) in entries[cut:]]
@@ -0,0 +1,180 @@
+from array import array
+
+"""A compact table for the labels of the solver. A label is a node together with a subset of the terminals"""
+
+
+class LabelTable:
+    """Hash table with open addressing (linear probing). The key packs the terminal subset and the node into one
+    integer: (set << node_bits) | node. Cost, predecessor and merge flag are stored in parallel arrays, so an entry
+    needs no objects. Missing labels have the default cost and no predecessor (-1).
+
+    Keys and predecessors only fit into the arrays if the sets have fewer than 63 - node_bits bits (set_bits, None if
+    unknown). Otherwise they are kept in lists, that hold arbitrary integers"""
+
+    def __init__(self, max_node, default, capacity=1024, set_bits=None):
+        self.node_bits = max(1, max_node.bit_length())
+        self.default = default
+        self.wide = set_bits is None or set_bits + self.node_bits >= 63
+        self._allocate(capacity)
+
+    def _allocate(self, capacity):
+        if self.wide:
+            self._keys = [-1] * capacity
+            self._pred = [0] * capacity
+        else:
+            self._keys = array('l', [-1]) * capacity
+            self._pred = array('l', [0]) * capacity
+        self._cost = array('l', [0]) * capacity
+        self._merge = array('b', [0]) * capacity
+        self._mask = capacity - 1
+        self._count = 0
+
+    def __len__(self):
+        return self._count
+
+    def memory(self):
+        """The size of the arrays in bytes. A list entry is a pointer, stored keys are boxed integers"""
+        if self.wide:
+            return len(self._keys) * (16 + self._cost.itemsize + self._merge.itemsize) + 64 * self._count
+
+        return len(self._keys) * (self._keys.itemsize + self._cost.itemsize + self._pred.itemsize
+                                  + self._merge.itemsize)
+
+    def key(self, n, set_id):
+        return (set_id << self.node_bits) | n
+
+    def _find(self, key):
+        """Returns the slot of the key, or the empty slot the key would be stored in as -(slot + 1)"""
+        keys = self._keys
+        mask = self._mask
+        # Fold the set bits into the lower bits and mix. The multiplier is small enough to stay within the int range
+        h = (key & 0xFFFFFFFF) ^ (key >> 32)
+        i = ((h * 0x45D9F3B) >> 16) & mask
+
+        while True:
+            k = keys[i]
+            if k == key:
+                return i
+            if k == -1:
+                return -i - 1
+            i = (i + 1) & mask
+
+    def cost(self, key):
+        # The lookups are on the hot path of the solver, the probing is repeated instead of calling _find
+        keys = self._keys
+        mask = self._mask
+        h = (key & 0xFFFFFFFF) ^ (key >> 32)
+        i = ((h * 0x45D9F3B) >> 16) & mask
+
+        while True:
+            k = keys[i]
+            if k == key:
+                return self._cost[i]
+            if k == -1:
+                return self.default
+            i = (i + 1) & mask
+
+    def get(self, key):
+        """Returns the tuple (cost, predecessor, is_merge)"""
+        i = self._find(key)
+        if i < 0:
+            return self.default, -1, False
+
+        return self._cost[i], self._pred[i], self._merge[i] == 1
+
+    def set(self, key, cost, pred, is_merge):
+        """Stores the label. The predecessor is a node, or the other subset in case of a merge"""
+        i = self._find(key)
+        if i < 0:
+            self._insert(-i - 1, key, cost, pred, is_merge)
+        else:
+            self._cost[i] = cost
+            self._pred[i] = pred
+            self._merge[i] = is_merge
+
+    def improve(self, key, cost, pred, is_merge):
+        """Stores the label if it is cheaper than the known one. Returns True if it was stored"""
+        keys = self._keys
+        mask = self._mask
+        h = (key & 0xFFFFFFFF) ^ (key >> 32)
+        i = ((h * 0x45D9F3B) >> 16) & mask
+
+        while True:
+            k = keys[i]
+            if k == key:
+                if cost >= self._cost[i]:
+                    return False
+                self._cost[i] = cost
+                self._pred[i] = pred
+                self._merge[i] = is_merge
+                return True
+            if k == -1:
+                if cost >= self.default:
+                    return False
+                self._insert(i, key, cost, pred, is_merge)
+                return True
+            i = (i + 1) & mask
+
+    def _insert(self, i, key, cost, pred, is_merge):
+        self._keys[i] = key
+        self._cost[i] = cost
+        self._pred[i] = pred
+        self._merge[i] = is_merge
+        self._count += 1
+
+        # Keep the load factor below 1/2, longer probe sequences get expensive in linear probing
+        if 2 * self._count > self._mask:
+            self._grow()
+
+    def remove(self, key):
+        """Removes the label. The following entries of the probe sequence are moved up, so no markers are needed"""
+        i = self._find(key)
+        if i < 0:
+            return
+
+        keys = self._keys
+        mask = self._mask
+        j = i
+        while True:
+            j = (j + 1) & mask
+            k = keys[j]
+            if k == -1:
+                break
+
+            # Move the entry into the gap, unless its home slot lies cyclically between the gap and its position
+            h = (k & 0xFFFFFFFF) ^ (k >> 32)
+            home = ((h * 0x45D9F3B) >> 16) & mask
+            if (j > i and (home <= i or home > j)) or (j < i and home <= i and home > j):
+                keys[i] = k
+                self._cost[i] = self._cost[j]
+                self._pred[i] = self._pred[j]
+                self._merge[i] = self._merge[j]
+                i = j
+
+        keys[i] = -1
+        self._count -= 1
+
+    def shrink(self):
+        """Reduces the capacity after many labels have been removed"""
+        capacity = len(self._keys)
+        while capacity > 1024 and 4 * self._count < capacity:
+            capacity /= 2
+
+        if capacity < len(self._keys):
+            self._resize(capacity)
+
+    def _grow(self):
+        self._resize(2 * len(self._keys))
+
+    def _resize(self, capacity):
+        keys, cost, pred, merge = self._keys, self._cost, self._pred, self._merge
+        self._allocate(capacity)
+
+        for i in xrange(0, len(keys)):
+            if keys[i] != -1:
+                j = -self._find(keys[i]) - 1
+                self._keys[j] = keys[i]
+                self._cost[j] = cost[i]
+                self._pred[j] = pred[i]
+                self._merge[j] = merge[i]
+                self._count += 1
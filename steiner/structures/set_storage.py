@@ -46,6 +46,10 @@ class SetStorage:
                     current_node_id = 2 * current_node_id + 2
                     # The new target is the set without the current terminal and with the next terminal
 
+    def memory(self):
+        """Estimates the memory used in bytes, a dictionary entry and a boxed integer per set"""
+        return 72 * len(self._nodes)
+
     def find_all(self, set_id):
         """" Returns all stored sets that are disjoint from the given set"""
 
@@ -131,3 +135,155 @@ class DebuggingSetStorage(SetStorage):
             # Return results
             for x in ref:
                 yield x
+
+
+class SubsetStorage:
+    """Storage for a small number of terminals. Besides the list of sets, a bitmap marks every stored subset. Disjoint
+    sets are the subsets of the complement, if there are fewer of these than stored sets they are enumerated,
+    otherwise the list is scanned"""
+
+    def __init__(self, cnt):
+        self._all = (1 << cnt) - 1
+        # Allocated on the first insert, most nodes never get a label
+        self._present = None
+        self._sets = []
+
+    def append(self, set_id):
+        if self._present is None:
+            self._present = bytearray(self._all + 1)
+        if not self._present[set_id]:
+            self._present[set_id] = 1
+            self._sets.append(set_id)
+
+    def __contains__(self, set_id):
+        return self._present is not None and self._present[set_id] == 1
+
+    def memory(self):
+        """Estimates the memory used in bytes: the bitmap, the list and a boxed integer per set"""
+        if self._present is None:
+            return 0
+        return len(self._present) + 128 + 32 * len(self._sets)
+
+    def find_all(self, set_id):
+        """Returns all stored sets that are disjoint from the given set"""
+        complement = self._all ^ set_id
+
+        if (1 << bin(complement).count("1")) >= len(self._sets):
+            return [x for x in self._sets if not x & set_id]
+
+        # Enumerate the non empty subsets of the complement
+        present = self._present
+        result = []
+        sub = complement
+        while sub:
+            if present[sub]:
+                result.append(sub)
+            sub = (sub - 1) & complement
+
+        return result
+
+    def find_supersets(self, set_id):
+        """Returns all stored sets that contain the given set, except the set itself"""
+        complement = self._all ^ set_id
+
+        if (1 << bin(complement).count("1")) >= len(self._sets):
+            return [x for x in self._sets if x & set_id == set_id and x != set_id]
+
+        # Enumerate the non empty subsets of the complement and add them to the set
+        present = self._present
+        result = []
+        sub = complement
+        while sub:
+            if present[sub | set_id]:
+                result.append(sub | set_id)
+            sub = (sub - 1) & complement
+
+        return result
+
+
+class ChunkedSetStorage:
+    """Storage for a large number of terminals. The sets are grouped by their lowest bits, i.e. a trie with a single
+    level of high fan-out. Only groups that are disjoint from the lowest bits of the given set have to be scanned"""
+
+    chunk_bits = 8
+
+    def __init__(self, cnt):
+        self._chunk_mask = (1 << min(cnt, self.chunk_bits)) - 1
+        self._groups = {}
+        self._count = 0
+
+    def append(self, set_id):
+        group = self._groups.get(set_id & self._chunk_mask)
+        if group is None:
+            self._groups[set_id & self._chunk_mask] = [set_id]
+            self._count += 1
+        elif set_id not in group:
+            group.append(set_id)
+            self._count += 1
+
+    def __contains__(self, set_id):
+        return set_id in self._groups.get(set_id & self._chunk_mask, ())
+
+    def memory(self):
+        """Estimates the memory used in bytes: a dictionary entry and a list per group, a boxed integer per set"""
+        return 128 * len(self._groups) + 32 * self._count
+
+    def find_all(self, set_id):
+        """Returns all stored sets that are disjoint from the given set"""
+        low = set_id & self._chunk_mask
+        complement = self._chunk_mask ^ low
+        groups = self._groups
+        result = []
+
+        # The lowest bits of a disjoint set are disjoint from the lowest bits of the set. Scan the groups if there are
+        # only a few
+        if len(groups) < (1 << bin(complement).count("1")):
+            for (group_id, group) in groups.iteritems():
+                if not group_id & low:
+                    result.extend([x for x in group if not x & set_id])
+            return result
+
+        # Enumerate all subsets of the complement including the empty one
+        sub = complement
+        while True:
+            group = groups.get(sub)
+            if group is not None:
+                result.extend([x for x in group if not x & set_id])
+            if sub == 0:
+                break
+            sub = (sub - 1) & complement
+
+        return result
+
+    def find_supersets(self, set_id):
+        """Returns all stored sets that contain the given set, except the set itself"""
+        low = set_id & self._chunk_mask
+        complement = self._chunk_mask ^ low
+        groups = self._groups
+        result = []
+
+        # The lowest bits of a superset contain the lowest bits of the set. Scan the groups if there are only a few
+        if len(groups) < (1 << bin(complement).count("1")):
+            for (group_id, group) in groups.iteritems():
+                if group_id & low == low:
+                    result.extend([x for x in group if x & set_id == set_id and x != set_id])
+            return result
+
+        sub = complement
+        while True:
+            group = groups.get(sub | low)
+            if group is not None:
+                result.extend([x for x in group if x & set_id == set_id and x != set_id])
+            if sub == 0:
+                break
+            sub = (sub - 1) & complement
+
+        return result
+
+
+def create_storage(cnt):
+    """Chooses the storage depending on the number of terminals"""
+    if cnt <= 10:
+        return SubsetStorage(cnt)
+
+    return ChunkedSetStorage(cnt)
@@ -0,0 +1,72 @@
+from heapq import heappush, heappop
+
+"""A bucket queue that only creates the buckets for priorities that are used. The used priorities are kept in a heap,
+so the queue needs neither an upper bound nor monotone priorities"""
+
+
+def create_queue():
+    # Buckets by priority, priority by key, heap of the priorities that have a bucket
+    return {}, {}, []
+
+
+def enqueue(queue, priority, key):
+    buckets, e, priorities = queue
+
+    # If existing and smaller, move item. The old bucket may become empty, it is removed when it reaches the top
+    current = e.get(key)
+    if current is not None:
+        if priority >= current:
+            return
+        buckets[current].remove(key)
+
+    bucket = buckets.get(priority)
+    if bucket is None:
+        buckets[priority] = {key}
+        heappush(priorities, priority)
+    else:
+        bucket.add(key)
+
+    e[key] = priority
+
+
+def dequeue(queue):
+    buckets, e, priorities = queue
+
+    # Drop empty buckets from the top
+    bucket = buckets[priorities[0]]
+    while not bucket:
+        del buckets[heappop(priorities)]
+        bucket = buckets[priorities[0]]
+
+    val = bucket.pop()
+    del e[val]
+
+    return val
+
+
+def size(queue):
+    return len(queue[1])
+
+
+def prune(queue, keep):
+    """Keeps the keep entries with the lowest priority, plus the ones tied with the last of them. Returns the highest
+    kept priority and the removed keys"""
+    buckets, e, priorities = queue
+    bound = None
+    removed = []
+    cnt = 0
+
+    for p in sorted(buckets):
+        if cnt < keep:
+            cnt += len(buckets[p])
+            bound = p
+        else:
+            removed.extend(buckets.pop(p))
+
+    for k in removed:
+        del e[k]
+
+    # Only the kept priorities remain, in ascending order this is still a heap
+    priorities[:] = sorted(buckets)
+
+    return bound, removed
@@ -1,25 +1,40 @@
-import networkx as nx
 from sys import maxint
+from array import array
 import steiner_approximation as sa
+from structures.array_graph import ArrayGraph
+from structures.terminal_distances import TerminalDistances
+from structures.closest_terminals import ClosestTerminals
+from structures.union_find import UnionFind
 from collections import defaultdict
-from heapq import heappop, heappush
+from heapq import heappop, heappush, heapify
+from copy import copy
+from networkx import relabel_nodes
 
 
 class SteinerGraph:
     """Data structure that stores an instance. I.e. a graph and terminals. Offers several helping methods"""
 
     def __init__(self):
-        self.graph = nx.Graph()
+        self.graph = ArrayGraph()
         self.terminals = set()
         self._closest_terminals = None
         self._lengths = {}
+        self._terminal_distances = None
         self._steiner_lengths = None
+        self._steiner_index = None
         self._approximation = None
+        # The cheapest outdated approximation (tree, cost), it may still be a solution
+        self._best_tree = None
         self._voronoi_areas = None
         self._radius = None
         self._restricted_lengths = {}
         self._restricted_closest = None
         self.lower_bound = 0
+        # Nodes touched by changes, in order. Reductions keep a position in there to find what changed since. The
+        # positions count from the first change, the changes seen by all reductions are dropped
+        self._journal = []
+        self._journal_start = 0
+        self._journal_positions = {}
 
         self._dist_validity = -2
         self._steiner_validity = -2
@@ -29,29 +44,126 @@ class SteinerGraph:
     def add_edge(self, n1, n2, c):
         """Adds an edge to the graph. Distances are updated in case it replaces the same edge with higher costs."""
         if self.graph.has_edge(n1, n2):
-            orig = self.graph[n1][n2]['weight']
+            orig = self.graph.weight(n1, n2)
             # Exists, but existing is more expensive
             if orig > c:
-                self.graph[n1][n2]['weight'] = c
+                self.set_weight(n1, n2, c)
                 return True
             # Cheaper edge exists
             else:
                 return False
 
         # Non-existing, simply add. This method
-        self.graph.add_edge(n1, n2, weight=c)
+        self.graph.add_edge(n1, n2, c)
+        self._edge_changed(n1, n2)
         return True
 
+    def set_weight(self, u, v, c):
+        self.graph.set_weight(u, v, c)
+        self._edge_changed(u, v)
+
     def remove_edge(self, u, v):
         self.graph.remove_edge(u, v)
+        self._edge_changed(u, v)
 
-        if self.graph.degree[u] == 0:
+        if self.graph.degree(u) == 0:
             self.remove_node(u)
-        if self.graph.degree[v] == 0:
+        if self.graph.degree(v) == 0:
             self.remove_node(v)
 
+    def _edge_changed(self, u, v):
+        """Keeps track of the changes so the terminal distances can be repaired instead of recalculated"""
+        self._journal.append(u)
+        self._journal.append(v)
+        if self._terminal_distances is not None:
+            self._terminal_distances.touch(u, v)
+
+    def journal_position(self):
+        """The current position in the change journal, see changed_since"""
+        return self._journal_start + len(self._journal)
+
+    def _touched(self, position):
+        """The existing nodes that have been touched since the journal position"""
+        return {n for n in self._journal[position - self._journal_start:] if self.graph.has_node(n)}
+
+    def changed_since(self, position):
+        """Returns the existing nodes that have been touched since the journal position, together with their
+        neighbors"""
+        result = self._touched(position)
+        for n in list(result):
+            result.update(self.graph.neighbors(n))
+
+        return result
+
+    def dirty_nodes(self, key):
+        """Returns the nodes touched since clean has been called with the key (usually a reduction), together with
+        their neighbors. None if all nodes have to be checked"""
+        position = self._journal_positions.get(key)
+
+        return None if position is None else self.changed_since(position)
+
+    def dirty_edges(self, key):
+        """Returns the edges (u, v, d) whose tests may have changed since clean has been called with the key, None if
+        all edges have to be checked. The tests search for a path of length at most d + 1 around the edge, changes
+        further away from both end points cannot change the result"""
+        position = self._journal_positions.get(key)
+        if position is None:
+            return None
+
+        # Distance of every node to the closest change, up to the longest search
+        touched = self._touched(position)
+        cut_off = self.graph.max_weight() + 1
+        dist = dict.fromkeys(touched, 0)
+        queue = [(0, n) for n in touched]
+        adj = self.graph.adj
+
+        while queue:
+            d, n = heappop(queue)
+            if d > dist[n]:
+                continue
+
+            for n2, w in adj(n):
+                d2 = d + w
+                if d2 <= cut_off and d2 < dist.get(n2, maxint):
+                    dist[n2] = d2
+                    heappush(queue, (d2, n2))
+
+        # An edge found from both end points is taken from the smaller one
+        result = []
+        for (u, du) in dist.iteritems():
+            for (v, w) in adj(u):
+                if du <= w + 1 and (u < v or dist.get(v, maxint) > w + 1):
+                    result.append((u, v, w))
+
+        return result
+
+    def clean(self, key):
+        """Marks the changes as seen by the key. Keys that fell behind by more journal entries than twice the number
+        of nodes get a full pass instead, afterwards the changes seen by all keys are dropped"""
+        end = self.journal_position()
+        positions = self._journal_positions
+        positions[key] = end
+
+        limit = end - 2 * len(self.graph.nodes)
+        for (k, p) in positions.items():
+            if p < limit:
+                del positions[k]
+
+        first = min(positions.itervalues())
+        if first > self._journal_start:
+            del self._journal[:first - self._journal_start]
+            self._journal_start = first
+
+    def incident_edges(self, nodes):
+        """Returns the edges with at least one end point in nodes. Every edge is contained once"""
+        adj = self.graph.adj
+
+        return [(u, v, w) for u in nodes for (v, w) in adj(u) if u < v or v not in nodes]
+
     def _reset_lengths(self):
         self._lengths = {}
+        if self._terminal_distances is not None:
+            self._terminal_distances.repair()
         self._closest_terminals = None
         self._voronoi_areas = None
         self._dist_validity = 0
@@ -62,12 +174,19 @@ class SteinerGraph:
         if self._dist_validity == -2:
             self._reset_lengths()
 
+        # Distances from terminals are stored in the matrix
+        if n1 in self.terminals:
+            dist = self.get_terminal_distances()
+            return dist.row(n1) if n2 is None else dist.get(n1, n2)
+        if n2 in self.terminals:
+            return self.get_terminal_distances().get(n2, n1)
+
         if n1 not in self._lengths:
             # If non-existing try the other way round. If still not existing calculate
             if n2 is not None and n2 in self._lengths:
                 return self._lengths[n2][n1]
             else:
-                self._lengths[n1] = nx.single_source_dijkstra_path_length(self.graph, n1)
+                self._lengths[n1] = self.graph.dijkstra(n1)
 
         # If n2 is empty return the distances to all other nodes
         if n2 is None:
@@ -75,40 +194,176 @@ class SteinerGraph:
 
         return self._lengths[n1][n2]
 
+    def get_terminal_distances(self):
+        """Returns the distance matrix between terminals and nodes"""
+        if self._dist_validity == -2:
+            self._reset_lengths()
+
+        if self._terminal_distances is None:
+            self._terminal_distances = TerminalDistances(self.graph, self.terminals)
+
+        return self._terminal_distances
+
+    def fork(self):
+        """Creates a copy of the instance without the cached information. The graph is copied on the first change"""
+        g = SteinerGraph()
+        g.graph = self.graph.fork()
+        g.terminals = set(self.terminals)
+        g.lower_bound = self.lower_bound
+
+        return g
+
+    def relabel(self):
+        """Creates a copy with the nodes numbered 0..n-1 in BFS order. Neighboring nodes get close ids, this keeps
+        the node indexed structures small and local. Returns the copy and the list that maps new ids to the old ones"""
+        labels = []
+        seen = set()
+
+        for s in sorted(self.terminals) + list(self.graph.nodes):
+            if s not in seen:
+                seen.add(s)
+                labels.append(s)
+                idx = len(labels) - 1
+                while idx < len(labels):
+                    for n in self.graph.neighbors(labels[idx]):
+                        if n not in seen:
+                            seen.add(n)
+                            labels.append(n)
+                    idx += 1
+
+        mapping = {n: i for (i, n) in enumerate(labels)}
+        us = []
+        vs = []
+        ws = []
+        for (u, v, w) in self.graph.edges(data='weight'):
+            us.append(mapping[u])
+            vs.append(mapping[v])
+            ws.append(w)
+
+        g = SteinerGraph()
+        g.graph = ArrayGraph.from_edges(us, vs, ws, len(labels))
+        for n in xrange(0, len(labels)):
+            g.graph.add_node(n)
+        g.terminals = {mapping[t] for t in self.terminals}
+        g.lower_bound = self.lower_bound
+
+        # The approximation is expensive, keep it if it is still up to date
+        if self._approximation is not None and self._approx_validity == 0 \
+                and all(n in mapping for n in self._approximation.tree.nodes):
+            app = copy(self._approximation)
+            app.tree = relabel_nodes(app.tree, mapping)
+            app._root = mapping.get(app._root)
+            app._descendants = None
+            app.steiner = g
+            g._approximation = app
+            g._approx_validity = 0
+
+        if self._best_tree is not None and all(n in mapping for n in self._best_tree[0].nodes):
+            g._best_tree = (relabel_nodes(self._best_tree[0], mapping), self._best_tree[1])
+
+        return g, labels
+
     def get_approximation(self):
         """ Returns an approximation that can be used as an upper bound"""
         if self._approximation is None or self._approx_validity != 0:
+            app = self._approximation
+            if app is not None and (self._best_tree is None or app.cost < self._best_tree[1]):
+                self._best_tree = (app.tree, app.cost)
+
             self._approximation = sa.SteinerApproximation(self)
 
         self._approx_validity = 0
 
         return self._approximation
 
-    def calculate_steiner_length(self):
-        self._steiner_lengths = {}
-        g = nx.Graph()
-
-        [g.add_edge(t1, t2, weight=self.get_lengths(t1, t2))
-         for t1 in self.terminals for t2 in self.terminals if t2 > t1]
-
-        mst = nx.minimum_spanning_tree(g)
-
-        for (t1, t2) in [(t1, t2) for t1 in self.terminals for t2 in self.terminals if t2 > t1]:
-            p = nx.shortest_path(mst, t1, t2)
-            max_l = 0
-            for i in xrange(1, len(p)):
-                max_l = max(max_l, g[p[i-1]][p[i]]['weight'])
+    def get_upper_bound(self):
+        """Returns a copy of the cheapest known solution as (tree, cost). Unlike get_approximation this avoids
+        calculating a new approximation if an older one is still a solution"""
+        candidates = [self._best_tree]
+        if self._approximation is not None:
+            candidates.append((self._approximation.tree, self._approximation.cost))
+        candidates = [c for c in candidates if c is not None and self._is_solution(c[0])]
+
+        if not candidates:
+            app = self.get_approximation()
+            candidates.append((app.tree, app.cost))
+
+        tree, cost = min(candidates, key=lambda x: x[1])
+        return tree.copy(), cost
+
+    def add_solution(self, tree, cost):
+        """Remembers the tree if it is cheaper than the best known solution"""
+        if self._best_tree is None or cost < self._best_tree[1]:
+            self._best_tree = (tree, cost)
+
+    def _is_solution(self, tree):
+        """Checks if the tree contains all terminals and only uses edges of the graph with their current weight"""
+        if not all(tree.has_node(t) for t in self.terminals):
+            return False
+
+        for (u, v, w) in tree.edges(data='weight'):
+            if not self.graph.has_edge(u, v) or self.graph.weight(u, v) != w:
+                return False
 
-            self._steiner_lengths.setdefault(t1, {})[t2] = max_l
+        return True
 
+    def calculate_steiner_length(self):
+        """Calculates the bottleneck distances between all terminals in the MST of the distance network. The MST is
+        taken from the network of edges between the voronoi areas (Mehlhorn), it is also an MST of the complete one"""
+        terminals = list(self.terminals)
+        k = len(terminals)
+        self._steiner_index = {t: i for (i, t) in enumerate(terminals)}
+        index = self._steiner_index
+
+        # Find the cheapest path between every two neighboring voronoi areas
+        bridges = {}
+        for (u, v, d) in self.graph.edges(data='weight'):
+            t1, d1 = (u, 0) if u in self.terminals else self.get_closest(u).get(0)
+            t2, d2 = (v, 0) if v in self.terminals else self.get_closest(v).get(0)
+
+            if t1 != t2 and d1 < maxint and d2 < maxint:
+                key = (t1, t2) if t1 < t2 else (t2, t1)
+                total = d1 + d + d2
+                if total < bridges.get(key, maxint):
+                    bridges[key] = total
+
+        # Kruskal
+        tree = [[] for _ in xrange(0, k)]
+        uf = UnionFind(terminals)
+        for ((t1, t2), d) in sorted(bridges.items(), key=lambda x: x[1]):
+            if uf.union(t1, t2):
+                tree[index[t1]].append((index[t2], d))
+                tree[index[t2]].append((index[t1], d))
+
+        # One DFS per terminal finds the largest edge on the path to all other terminals
+        lengths = array('l', [maxint]) * (k * k)
+        for i in xrange(0, k):
+            offset = i * k
+            lengths[offset + i] = 0
+            stack = [i]
+            while stack:
+                x = stack.pop()
+                c_max = lengths[offset + x]
+                for (y, d) in tree[x]:
+                    if lengths[offset + y] == maxint and y != i:
+                        lengths[offset + y] = max(c_max, d)
+                        stack.append(y)
+
+        self._steiner_lengths = lengths
         self._steiner_validity = 0
 
     # TODO: Use bound
-    def get_steiner_lengths(self, n1, n2, bound):
+    def get_steiner_table(self):
+        """Returns the table of bottleneck distances between terminals, see calculate_steiner_length"""
         if self._steiner_lengths is None or self._steiner_validity == -2:
-            self.calculate_steiner_length()
             self._voronoi_areas = None
             self._closest_terminals = None
+            self.calculate_steiner_length()
+
+        return self._steiner_lengths
+
+    def get_steiner_lengths(self, n1, n2, bound):
+        self.get_steiner_table()
 
         if n1 > n2:
             n1, n2 = n2, n1
@@ -118,11 +373,11 @@ class SteinerGraph:
         cls2 = self.get_closest(n2)
 
         # Current bound is the edge length (if it exists)
-        sd = self.graph[n1][n2]['weight'] if self.graph.has_edge(n1, n2) else maxint
+        sd = self.graph.weight(n1, n2) if self.graph.has_edge(n1, n2) else maxint
         closest1 = [cls1[0]] if n1 in self.terminals \
-            else [cls1[i] for i in xrange(min(3, len(self.terminals))) if cls1[i][1] < sd]
+            else [x for x in (cls1.get(i) for i in xrange(min(3, len(self.terminals)))) if x[1] < sd]
         closest2 = [cls2[0]] if n2 in self.terminals \
-            else [cls2[i] for i in xrange(min(3, len(self.terminals))) if cls2[i][1] < sd]
+            else [x for x in (cls2.get(i) for i in xrange(min(3, len(self.terminals)))) if x[1] < sd]
 
         if len(closest1) == 0 or len(closest2) == 0:
             return sd
@@ -134,9 +389,11 @@ class SteinerGraph:
                 if ct1[0] == ct2[0]:
                     sd = min(sd, val)
                 else:
-                    t1 = min(ct1[0], ct2[0])
-                    t2 = max(ct1[0], ct2[0])
-                    sd = min(sd, max(val, self._steiner_lengths[t1][t2]))
+                    idx1 = self._steiner_index.get(ct1[0])
+                    idx2 = self._steiner_index.get(ct2[0])
+                    # Terminals that have been moved since the calculation are not part of the table
+                    if idx1 is not None and idx2 is not None:
+                        sd = min(sd, max(val, self._steiner_lengths[idx1 * len(self._steiner_index) + idx2]))
 
         return sd
 
@@ -155,9 +412,8 @@ class SteinerGraph:
     def contract_edge(self, u, v):
         ret = []
         # Contract
-        for ng in nx.neighbors(self.graph, v):
+        for ng, d in self.graph.adj(v):
             if ng != u:
-                d = self.graph[v][ng]['weight']
                 if self.add_edge(u, ng, d):
                     ret.append(((u, ng, d), (v, ng, d)))
 
@@ -170,6 +426,8 @@ class SteinerGraph:
 
     def remove_node(self, n):
         if self.graph.has_node(n):
+            for n2 in self.graph.neighbors(n):
+                self._edge_changed(n, n2)
             self.graph.remove_node(n)
 
         self._lengths.pop(n, None)
@@ -178,21 +436,32 @@ class SteinerGraph:
 
         if n in self.terminals:
             self.terminals.remove(n)
+            if self._terminal_distances is not None:
+                self._terminal_distances.remove_terminal(n)
 
     def move_terminal(self, t_source, t_target):
         if self._dist_validity == -2:
             self._reset_lengths()
 
         self.terminals.remove(t_source)
+        self._journal.append(t_source)
+        self._journal.append(t_target)
+
+        if self._terminal_distances is not None:
+            self._terminal_distances.remove_terminal(t_source)
+            if t_target not in self.terminals:
+                self._terminal_distances.add_terminal(t_target)
 
         if self._closest_terminals is not None:
+            lengths = None
+            if t_target not in self.terminals:
+                lengths = self._terminal_distances.row(t_target) if self._terminal_distances is not None \
+                    else defaultdict(lambda: maxint, self.graph.dijkstra(t_target))
+
             for i in xrange(0, len(self._closest_terminals)):
                 if self._closest_terminals[i] is not None:
                     if self.graph.has_node(i):
-                        self._closest_terminals[i] = [x for x in self._closest_terminals[i] if x[0] != t_source]
-                        if t_target not in self.terminals:
-                            self._closest_terminals[i].append((t_target, self.get_lengths(t_target, i)))
-                            self._closest_terminals[i].sort(key=lambda xx: xx[1])
+                        self._closest_terminals[i].move(t_source, t_target, lengths[i] if lengths is not None else None)
                     else:
                         self._closest_terminals[i] = None
 
@@ -232,19 +501,12 @@ class SteinerGraph:
             for t in self.terminals:
                 self._voronoi_areas[t] = set()
 
-            for n in nx.nodes(self.graph):
+            # Nodes that cannot reach a terminal are in no area
+            for n in self.graph.nodes:
                 if n not in self.terminals:
-                    min_val = maxint
-                    min_node = None
-
-                    for t in self.terminals:
-                        c = self.get_lengths(t, n)
-
-                        if c < min_val:
-                            min_val = c
-                            min_node = t
-
-                    self._voronoi_areas[min_node].add(n)
+                    t = self.get_closest(n).get(0)[0]
+                    if t is not None:
+                        self._voronoi_areas[t].add(n)
 
         return self._voronoi_areas
 
@@ -253,30 +515,58 @@ class SteinerGraph:
             self._reset_lengths()
 
         if self._closest_terminals is None:
-            max_node = max(nx.nodes(self.graph))
-            self._closest_terminals = list([None] * (max_node + 1))
-
-        if self._closest_terminals[n] is None:
-            self._closest_terminals[n] = [(t, self.get_lengths(t, n)) for t in self.terminals]
-            self._closest_terminals[n].sort(key=lambda x: x[1])
+            self.find_closest()
 
         return self._closest_terminals[n]
 
+    def find_closest(self):
+        """Finds the three closest terminals for every node in one multi-source Dijkstra. The voronoi area of a node
+        is the one of the closest terminal. Further terminals are added from the distance matrix on demand. A node
+        that got fewer than three terminals has all the terminals it can reach, since a path is only blocked by a
+        node that already has three"""
+        max_node = max(self.graph.nodes) + 1
+        closest = [[] for _ in xrange(0, max_node)]
+        queue = [(0, t, t) for t in self.terminals]
+        heapify(queue)
+
+        push = heappush
+        pop = heappop
+        adj = self.graph.adj
+
+        while queue:
+            dist, n, t = pop(queue)
+
+            c = closest[n]
+            if len(c) == 3 or any(x[0] == t for x in c):
+                continue
+            c.append((t, dist))
+
+            for n2, w in adj(n):
+                if len(closest[n2]) < 3:
+                    push(queue, (dist + w, n2, t))
+
+        k = len(self.terminals)
+        self._closest_terminals = [ClosestTerminals(n, closest[n], len(closest[n]) < 3 or len(closest[n]) == k,
+                                                    self.get_terminal_distances)
+                                   if self.graph.has_node(n) else None for n in xrange(0, max_node)]
+
     def get_radius(self):
         if self._dist_validity == -2:
             self._reset_lengths()
 
-        # This can be included into voronoi generation for efficiency. It is not for readability
+        # The closest node outside the voronoi area is reached by an edge leaving the area
         if self._radius is None:
-            vor = self.get_voronoi()
-            radius_tmp = defaultdict(lambda: maxint)
+            radius_tmp = {t: maxint for t in self.terminals} if len(self.terminals) > 1 else {}
+
+            for (u, v, d) in self.graph.edges(data='weight'):
+                t1, d1 = (u, 0) if u in self.terminals else self.get_closest(u).get(0)
+                t2, d2 = (v, 0) if v in self.terminals else self.get_closest(v).get(0)
 
-            for t, l in vor.items():
-                for t2 in self.terminals:
-                    if t2 != t:
-                        radius_tmp[t2] = min(radius_tmp[t2], self.get_lengths(t2, t))
-                        for n in l:
-                            radius_tmp[t2] = min(radius_tmp[t2], self.get_lengths(t2, n))
+                if t1 != t2:
+                    if d1 < maxint:
+                        radius_tmp[t1] = min(radius_tmp[t1], d1 + d)
+                    if d2 < maxint:
+                        radius_tmp[t2] = min(radius_tmp[t2], d2 + d)
 
             self._radius = [(y, x) for (x, y) in radius_tmp.items()]
             self._radius.sort(key=lambda tup: tup[0])
@@ -299,7 +589,7 @@ class SteinerGraph:
 
         push = heappush
         pop = heappop
-        nb = self.graph._adj
+        adj = self.graph.adj
         done = set()
 
         while queue:
@@ -312,8 +602,8 @@ class SteinerGraph:
             restricted[t][n] = dist
             closest[n].append((t, dist))
 
-            for n2, dta in nb[n].items():
-                tot = dist + dta['weight']
+            for n2, w in adj(n):
+                tot = dist + w
                 if tot < restricted[t][n2]:
                     restricted[t][n2] = tot
 
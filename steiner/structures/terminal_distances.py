@@ -0,0 +1,210 @@
+from array import array
+from heapq import heappush, heappop
+from operator import itemgetter
+from sys import maxint
+
+"""Stores the distances between the terminals and all nodes in one contiguous k x n matrix. Changes to the graph
+can be repaired incrementally (Ramalingam-Reps style) instead of recalculating all rows"""
+
+
+class TerminalDistances:
+    """Distance matrix with one row per terminal. A row is indexed by node id, a column contains the distances of a
+    node to all terminals in the order of the terminals list. Unreachable nodes have the distance maxint"""
+
+    def __init__(self, graph, terminals):
+        self.graph = graph
+        self._build(list(terminals))
+
+    def _build(self, terminals):
+        self.width = max(self.graph.nodes) + 1 if len(self.graph.nodes) > 0 else 0
+        self.terminals = []
+        self.index = {}
+        self._dist = array('l')
+        # The predecessor of every node in the shortest path tree of the row's terminal, -1 for none
+        self._parent = array('l')
+        # Edges that changed since the rows have been calculated
+        self._changed = set()
+        self._rebuild = False
+
+        self._calculate(terminals)
+
+    def _calculate(self, terminals):
+        """Fills the rows for all given terminals in one pass"""
+        width = self.width
+        dist = self._dist
+        parent = self._parent
+        dist.extend(array('l', [maxint]) * (len(terminals) * width))
+        parent.extend(array('l', [-1]) * (len(terminals) * width))
+        adj = self.graph.adj
+
+        for t in terminals:
+            offset = len(self.terminals) * width
+            self.index[t] = len(self.terminals)
+            self.terminals.append(t)
+
+            # Dijkstra directly on the matrix row. Entries are only pushed on improvement, outdated queue entries
+            # are recognized by a distance larger than the one stored
+            dist[offset + t] = 0
+            queue = [(0, t)]
+            while queue:
+                d, n = heappop(queue)
+
+                if d > dist[offset + n]:
+                    continue
+
+                for n2, w in adj(n):
+                    d2 = d + w
+                    if d2 < dist[offset + n2]:
+                        dist[offset + n2] = d2
+                        parent[offset + n2] = n
+                        heappush(queue, (d2, n2))
+
+    def _check(self, n):
+        """Rebuilds the matrix if node n has been added since, its id would point into the next row"""
+        if n >= self.width:
+            self._rebuild = True
+            self.repair()
+            if n >= self.width:
+                raise KeyError(n)
+
+    def get(self, t, n):
+        """The distance between terminal t and node n"""
+        if n >= self.width:
+            self._check(n)
+        return self._dist[self.index[t] * self.width + n]
+
+    def row(self, t):
+        """The distances from terminal t to all nodes, indexed by node id"""
+        offset = self.index[t] * self.width
+        return self._dist[offset:offset + self.width]
+
+    def column(self, n):
+        """The distances from node n to all terminals, in the order of the terminals list"""
+        self._check(n)
+        return self._dist[n::self.width]
+
+    def path(self, t, n):
+        """Returns the nodes on a shortest path from node n to terminal t"""
+        self._check(n)
+        offset = self.index[t] * self.width
+        parent = self._parent
+        result = [n]
+
+        while n != t:
+            n = parent[offset + n]
+            result.append(n)
+
+        return result
+
+    def closest(self, n):
+        """Returns a list of (terminal, distance) tuples, sorted ascending by distance"""
+        self._check(n)
+        result = zip(self.terminals, self._dist[n::self.width])
+        result.sort(key=itemgetter(1))
+
+        return result
+
+    def add_terminal(self, t):
+        if t not in self.index:
+            self._calculate([t])
+
+    def remove_terminal(self, t):
+        idx = self.index.pop(t, None)
+        if idx is None:
+            return
+
+        del self._dist[idx * self.width:(idx + 1) * self.width]
+        del self._parent[idx * self.width:(idx + 1) * self.width]
+        self.terminals.pop(idx)
+        for i in xrange(idx, len(self.terminals)):
+            self.index[self.terminals[i]] = i
+
+    def touch(self, u, v):
+        """Records that the edge between u and v has been added, removed or changed its weight"""
+        if u >= self.width or v >= self.width:
+            self._rebuild = True
+        else:
+            self._changed.add((u, v) if u < v else (v, u))
+
+    def repair(self):
+        """Updates all rows to the current graph"""
+        if self._rebuild or 4 * len(self._changed) > len(self.graph.edges):
+            # Too many changes, the affected areas will cover most of the graph anyway
+            self._build(self.terminals)
+        elif len(self._changed) > 0:
+            for i in xrange(0, len(self.terminals)):
+                self._repair_row(i * self.width)
+
+        self._changed = set()
+
+    def _repair_row(self, offset):
+        dist = self._dist
+        parent = self._parent
+        g = self.graph
+        adj = g.adj
+
+        # Deletions and increases: Find the nodes whose tree path contains a changed edge.
+        affected = set()
+        stack = []
+        for (u, v) in self._changed:
+            for (x, y) in ((u, v), (v, u)):
+                if parent[offset + y] == x and y in g.nodes and y not in affected:
+                    try:
+                        if dist[offset + x] + g.weight(x, y) == dist[offset + y]:
+                            continue
+                    except KeyError:
+                        pass
+                    affected.add(y)
+                    stack.append(y)
+
+        while stack:
+            x = stack.pop()
+            for y, w in adj(x):
+                if parent[offset + y] == x and y not in affected:
+                    affected.add(y)
+                    stack.append(y)
+
+        # The unaffected nodes keep their distance, which is still the length of a path. Restart the affected nodes
+        # from their border
+        queue = []
+        for x in affected:
+            best = maxint
+            best_p = -1
+            for y, w in adj(x):
+                if y not in affected:
+                    d = dist[offset + y]
+                    if d != maxint and d + w < best:
+                        best = d + w
+                        best_p = y
+
+            dist[offset + x] = best
+            parent[offset + x] = best_p
+            if best_p >= 0:
+                heappush(queue, (best, x))
+
+        # Insertions and decreases: Start from the changed edges
+        for (u, v) in self._changed:
+            try:
+                w = g.weight(u, v)
+            except KeyError:
+                continue
+
+            for (x, y) in ((u, v), (v, u)):
+                d = dist[offset + x]
+                if d != maxint and d + w < dist[offset + y]:
+                    dist[offset + y] = d + w
+                    parent[offset + y] = x
+                    heappush(queue, (d + w, y))
+
+        # Propagate the improvements
+        while queue:
+            d, x = heappop(queue)
+            if d > dist[offset + x]:
+                continue
+
+            for y, w in adj(x):
+                d2 = d + w
+                if d2 < dist[offset + y]:
+                    dist[offset + y] = d2
+                    parent[offset + y] = x
+                    heappush(queue, (d2, y))
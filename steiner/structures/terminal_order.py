@@ -0,0 +1,64 @@
+from array import array
+
+"""The terminals sorted by distance to a node, indexed by the bits of the solver sets"""
+
+
+class TerminalOrder:
+    """The terminals of one node in the order of the closest terminals, with the bit of every terminal and the union
+    of the bits up to every position. The first terminals within a set are found by binary search over the unions.
+    The unions are kept in an array if they fit into a C long, otherwise in a list"""
+
+    def __init__(self, closest, bits):
+        self.nodes = array('l')
+        self.dists = array('l')
+        prefix = []
+
+        mask = 0
+        for (t, d) in closest:
+            mask |= bits[t]
+            self.nodes.append(t)
+            self.dists.append(d)
+            prefix.append(mask)
+
+        self.prefix = array('l', prefix) if mask.bit_length() < 63 else prefix
+
+    def first(self, mask):
+        """Returns the position of the first terminal in the mask, -1 if there is none"""
+        prefix = self.prefix
+        if not prefix:
+            return -1
+        # Usually the closest terminal already is in the set
+        if prefix[0] & mask:
+            return 0
+        if not prefix[-1] & mask:
+            return -1
+
+        lo, hi = 1, len(prefix) - 1
+        while lo < hi:
+            mid = (lo + hi) >> 1
+            if prefix[mid] & mask:
+                hi = mid
+            else:
+                lo = mid + 1
+
+        return lo
+
+    def second(self, mask):
+        """Returns the position of the second terminal in the mask, -1 if there is none"""
+        prefix = self.prefix
+        if not prefix:
+            return -1
+        m = prefix[-1] & mask
+        if not m & (m - 1):
+            return -1
+
+        lo, hi = 1, len(prefix) - 1
+        while lo < hi:
+            mid = (lo + hi) >> 1
+            m = prefix[mid] & mask
+            if m & (m - 1):
+                hi = mid
+            else:
+                lo = mid + 1
+
+        return lo